@@ -79,7 +79,13 @@ class SettingsPanel:
         canvas.bind("<Configure>", lambda e, c=canvas, cw=canvas_window: c.itemconfigure(cw, width=e.width))
         canvas.configure(yscrollcommand=scrollbar.set)
 
-        for index, (key_name, field_info_obj) in enumerate(section_model_instance.model_fields.items()):
+        fields = [
+          (key_name, field_info_obj)
+          for key_name, field_info_obj in section_model_instance.model_fields.items()
+          # nested tables have no single widget, they are edited in config.toml and saved untouched
+          if not isinstance(getattr(section_model_instance, key_name), (dict, list, BaseModel))
+        ]
+        for index, (key_name, field_info_obj) in enumerate(fields):
           current_value = getattr(section_model_instance, key_name)
 
           label_widget, entry_widget = self._create_field_widget(
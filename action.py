@@ -0,0 +1,136 @@
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from control import ControlInterface
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(order=True)
+class Action:
+  """A queued control call, higher priority runs first and equal priorities run in order."""
+
+  sort_key: tuple[int, int] = field(init=False, repr=False)
+  priority: int = field(compare=False)
+  seq: int = field(compare=False)
+  kind: str = field(compare=False)
+  args: tuple[Any, ...] = field(compare=False)
+  deadline: float = field(compare=False)
+
+  def __post_init__(self) -> None:
+    """Order by priority, then by submission for equal priorities."""
+    self.sort_key = (-self.priority, self.seq)
+
+  def raise_to(self, priority: int, deadline: float) -> None:
+    """Take the higher priority and later deadline of this action and a merged duplicate."""
+    self.priority = max(self.priority, priority)
+    self.deadline = max(self.deadline, deadline)
+    self.sort_key = (-self.priority, self.seq)
+
+
+class ActionExecutor:
+  """Run control actions for one device on a worker thread so the decision loop never blocks.
+
+  Taps within coalesce_radius pixels of a pending tap are merged into it, keeping the higher
+  priority and later deadline of both, and taps near one executed within coalesce_window seconds
+  are discarded. Actions whose deadline passed before their turn are dropped.
+  """
+
+  def __init__(self, control: ControlInterface, coalesce_window: float = 0.15, coalesce_radius: float = 10) -> None:
+    self.control = control
+    self.coalesce_window = coalesce_window
+    self.coalesce_radius = coalesce_radius
+    self.executed = 0
+    self.dropped = 0
+    self.merged = 0
+    self._queue: list[Action] = []
+    self._recent_taps: list[tuple[float, tuple[int, int]]] = []
+    self._seq = itertools.count()
+    self._cond = threading.Condition()
+    self._thread: threading.Thread | None = None
+    self._running = False
+
+  def start(self) -> None:
+    """Start the worker thread."""
+    self._running = True
+    self._thread = threading.Thread(target=self._run, name="action-executor", daemon=True)
+    self._thread.start()
+
+  def stop(self) -> None:
+    """Stop the worker thread after the action in progress, pending actions are discarded."""
+    with self._cond:
+      self._running = False
+      self._queue.clear()
+      self._cond.notify()
+    if self._thread is not None:
+      self._thread.join()
+
+  def _merge_tap(self, pos: tuple[int, int], priority: int, deadline: float, now: float) -> bool:
+    """Fold a tap into a nearby pending or just executed one, False if there is none."""
+    for action in self._queue:
+      if action.kind == "tap" and math.dist(pos, action.args[0]) <= self.coalesce_radius:
+        action.raise_to(priority, deadline)
+        heapq.heapify(self._queue)
+        return True
+    self._recent_taps = [(t, p) for t, p in self._recent_taps if now - t <= self.coalesce_window]
+    return any(math.dist(pos, p) <= self.coalesce_radius for _, p in self._recent_taps)
+
+  def submit(self, kind: str, *args: Any, priority: int = 0, ttl: float = 0.5) -> bool:
+    """Queue an action, returns False if it was merged into an earlier tap."""
+    now = time.monotonic()
+    with self._cond:
+      if kind == "tap" and self._merge_tap(args[0], priority, now + ttl, now):
+        self.merged += 1
+        return False
+      heapq.heappush(self._queue, Action(priority, next(self._seq), kind, args, now + ttl))
+      self._cond.notify()
+    return True
+
+  def tap(self, pos: tuple[int, int], priority: int = 0, ttl: float = 0.5) -> bool:
+    """Queue a tap."""
+    return self.submit("tap", pos, priority=priority, ttl=ttl)
+
+  def drag(self, src: tuple[int, int], dst: tuple[int, int], priority: int = 0, ttl: float = 1.0) -> bool:
+    """Queue a drag."""
+    return self.submit("drag", src, dst, priority=priority, ttl=ttl)
+
+  def back(self, priority: int = 0, ttl: float = 1.0) -> bool:
+    """Queue a BACK event."""
+    return self.submit("back", priority=priority, ttl=ttl)
+
+  def pending(self) -> int:
+    """Return the number of queued actions."""
+    with self._cond:
+      return len(self._queue)
+
+  def _next(self) -> Action | None:
+    with self._cond:
+      while self._running and not self._queue:
+        self._cond.wait()
+      if not self._running:
+        return None
+      return heapq.heappop(self._queue)
+
+  def _run(self) -> None:
+    while True:
+      action = self._next()
+      if action is None:
+        return
+      if time.monotonic() > action.deadline:
+        self.dropped += 1
+        logger.debug("Dropped stale %s%s", action.kind, action.args)
+        continue
+      try:
+        getattr(self.control, action.kind)(*action.args)
+        self.executed += 1
+        if action.kind == "tap":
+          with self._cond:
+            self._recent_taps.append((time.monotonic(), action.args[0]))
+      except Exception:
+        logger.exception("Action %s%s failed", action.kind, action.args)
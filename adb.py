@@ -1,3 +1,4 @@
+import struct
 from collections.abc import Callable
 from typing import Any, TypeVar
 
@@ -5,7 +6,9 @@ import scrcpy
 from adbutils import AdbDevice, adb
 from PIL import Image
 
+from hub import FrameHub
 from mode import ADBMode
+from shell import ShellSession
 
 T = TypeVar("T")
 
@@ -30,6 +33,9 @@ class ADB:
     self.client: scrcpy.Client = None
     self.adb_device_code: str = ""
     self.frame = None
+    self.hub = FrameHub()
+    self.flip = False
+    self.shell: ShellSession = None
 
   def click(self, xy: tuple[int, int]) -> None:
     """Simulate android click on given position."""
@@ -39,17 +45,48 @@ class ADB:
     """Swipe from start point to end point."""
     self.d.swipe(src[0], src[1], dst[0], dst[1], time)
 
-  def touch(self, xy: tuple[int, int], action: int) -> bytes:
+  def touch(self, xy: tuple[int, int], action: int, touch_id: int = -1) -> bytes:
     """Touch screen."""
-    return self.client.control.touch(xy[0], xy[1], action)
+    return self.client.control.touch(xy[0], xy[1], action, touch_id)
+
+  def touch_batch(self, events: list[tuple[tuple[int, int], int, int]]) -> bytes:
+    """Send several (xy, action, touch_id) touch events in a single control socket write."""
+    # same layout as scrcpy.ControlSender.touch, packed here so all pointers move together
+    width, height = self.client.resolution
+    package = b"".join(
+      struct.pack(
+        ">BBqiiHHHi",
+        scrcpy.TYPE_INJECT_TOUCH_EVENT,
+        action,
+        touch_id,
+        max(int(x), 0),
+        max(int(y), 0),
+        int(width),
+        int(height),
+        0xFFFF,
+        1,
+      )
+      for (x, y), action, touch_id in events
+    )
+    with self.client.control_socket_lock:
+      self.client.control_socket.sendall(package)
+    return package
+
+  def keycode(self, keycode: int, action: int) -> bytes:
+    """Inject an android key event through the scrcpy control socket."""
+    return self.client.control.keycode(keycode, action)
 
   def back(self) -> None:
     """Simulate android BACK event."""
-    self.d.keyevent("KEYCODE_BACK")
+    if self.client is not None:
+      self.keycode(scrcpy.KEYCODE_BACK, scrcpy.ACTION_DOWN)
+      self.keycode(scrcpy.KEYCODE_BACK, scrcpy.ACTION_UP)
+    else:
+      self.shell.keyevent("KEYCODE_BACK")
 
   def home(self) -> None:
     """Simulate android HOME event."""
-    self.d.keyevent("HOME")
+    self.shell.keyevent("KEYCODE_HOME")
 
   def get_resolution(self) -> tuple[int, int] | None:
     """Get android device's resolution if client exist."""
@@ -70,9 +107,11 @@ class ADB:
       r = (output, success)
       if success:
         self.d = adb.device(serial=self.adb_device_code)
+        self.shell = ShellSession(self.d)
     elif mode == ADBMode.ID:
       self.adb_device_code = id
       self.d = adb.device(serial=device_id)
+      self.shell = ShellSession(self.d)
       r = ("Use device ID, skip connection", True)
 
     return r
@@ -85,14 +124,18 @@ class ADB:
       # may receive None to avoid blocking event.
       if frame is not None:
         self.frame = frame
+        self.hub.publish(frame)
         update_screen(frame)
 
-    self.client = scrcpy.Client(device=self.d, max_fps=max_fps, bitrate=bitrate, flip=(mode == ADBMode.IP))
+    self.flip = mode == ADBMode.IP
+    self.client = scrcpy.Client(device=self.d, max_fps=max_fps, bitrate=bitrate, flip=self.flip)
     self.client.add_listener(scrcpy.EVENT_FRAME, on_frame)
     self.client.start(threaded=True)
 
   def disconnect(self) -> None:
     """Disconnect from a client."""
+    if self.shell is not None:
+      self.shell.close()
     if self.client is not None:
       self.client.stop()
     if self.adb_device_code != "":
@@ -100,10 +143,9 @@ class ADB:
 
   def detect_app(self) -> tuple[bool, str]:
     """Detect if the device is running the app."""
-    app_info = self.d.app_current()
-    return (self.package_name in app_info.package, app_info.package)
+    package, _ = self.shell.current_app()
+    return (self.package_name in package, package)
 
   def restart(self) -> None:
     """Restart the app."""
-    self.d.app_stop(self.package_name)
-    self.d.app_start(self.package_name)
+    self.shell.restart_app(self.package_name)
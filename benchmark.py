@@ -0,0 +1,180 @@
+import argparse
+import importlib
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import cv2
+import numpy as np
+
+from config import DetectionSettings
+from detect import Detect, load_model
+from models.interface import to_image
+
+if TYPE_CHECKING:
+  from roi import Box
+
+logger = logging.getLogger(__name__)
+
+Corpus = list[tuple[np.ndarray, dict[str, Any]]]
+
+
+@dataclass
+class BenchResult:
+  name: str
+  frames: int
+  accuracy: float
+  p50_ms: float
+  p95_ms: float
+  p99_ms: float
+  throughput: float
+  peak_memory: int
+
+
+def load_corpus(corpus_dir: str | Path) -> Corpus:
+  """Load frames and their labels from labels.json, mapping file names to {detector: expected}."""
+  corpus = Path(corpus_dir)
+  with (corpus / "labels.json").open("r", encoding="utf-8") as f:
+    labels = json.load(f)
+  frames = []
+  for file_name, expected in labels.items():
+    frame = cv2.imread(str(corpus / file_name))
+    if frame is None:
+      logger.warning("Skip unreadable frame '%s'", file_name)
+      continue
+    frames.append((frame, expected))
+  return frames
+
+
+def _matches(result: Any, expected: Any) -> bool:
+  return result == expected or str(getattr(result, "name", result)) == str(expected)
+
+
+def run_bench(name: str, fn: Callable[[np.ndarray], Any], corpus: Corpus) -> BenchResult:
+  """Time fn over every frame labeled for name, then measure its peak memory in a second pass."""
+  frames = [(frame, expected[name]) for frame, expected in corpus if name in expected]
+  latencies = []
+  correct = 0
+  start = time.perf_counter()
+  for frame, expected in frames:
+    t = time.perf_counter()
+    result = fn(frame)
+    latencies.append(time.perf_counter() - t)
+    correct += _matches(result, expected)
+  total = time.perf_counter() - start
+
+  # tracemalloc slows allocations down, so memory gets its own pass
+  tracemalloc.start()
+  for frame, _ in frames:
+    fn(frame)
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000 if latencies else (0.0, 0.0, 0.0)
+  return BenchResult(
+    name,
+    len(frames),
+    correct / len(frames) if frames else 0.0,
+    float(p50),
+    float(p95),
+    float(p99),
+    len(frames) / total if total > 0 else 0.0,
+    peak,
+  )
+
+
+def compare(results: list[BenchResult], baseline: dict[str, dict], tolerance: float) -> list[str]:
+  """Return a message for every result that got less accurate or slower than the baseline."""
+  regressions = []
+  for r in results:
+    base = baseline.get(r.name)
+    if base is None:
+      continue
+    if r.accuracy < base["accuracy"]:
+      regressions.append(f"{r.name}: accuracy {base['accuracy']:.3f} -> {r.accuracy:.3f}")
+    if r.p95_ms > base["p95_ms"] * (1 + tolerance):
+      regressions.append(f"{r.name}: p95 {base['p95_ms']:.2f}ms -> {r.p95_ms:.2f}ms")
+  return regressions
+
+
+def format_results(results: list[BenchResult], baseline: dict[str, dict]) -> str:
+  """Render results as a table, with the baseline p95 when there is one."""
+  lines = [
+    f"{'name':<24}{'frames':>7}{'acc':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'fps':>9}{'peak KiB':>10}{'base p95':>10}",
+  ]
+  for r in results:
+    base = baseline.get(r.name, {}).get("p95_ms")
+    lines.append(
+      f"{r.name:<24}{r.frames:>7}{r.accuracy:>8.3f}{r.p50_ms:>9.2f}{r.p95_ms:>9.2f}{r.p99_ms:>9.2f}"
+      f"{r.throughput:>9.1f}{r.peak_memory / 1024:>10.1f}{'-' if base is None else f'{base:.2f}':>10}",
+    )
+  return "\n".join(lines)
+
+
+def main() -> int:
+  """Run the benchmark from the command line."""
+  parser = argparse.ArgumentParser(description="Benchmark detectors and models on a labeled frame corpus.")
+  parser.add_argument("corpus", help="directory with frames and labels.json")
+  parser.add_argument("--setup", help="module:function called with a Detect to register detectors")
+  parser.add_argument("--model", action="append", default=[], help="name=path of a model to benchmark")
+  parser.add_argument("--roi", action="append", default=[], help="name=left,top,right,bottom crop fed to a model")
+  parser.add_argument("--baseline", help="baseline json to compare with")
+  parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline")
+  parser.add_argument("--tolerance", type=float, default=0.1, help="allowed p95 slowdown ratio")
+  args = parser.parse_args()
+
+  # no prediction cache, repeated frames would otherwise be timed as cache hits
+  detect = Detect(DetectionSettings(cache_size=0))
+  if args.setup:
+    module_name, _, function_name = args.setup.partition(":")
+    getattr(importlib.import_module(module_name), function_name)(detect)
+
+  corpus = load_corpus(args.corpus)
+  results = []
+  for name, detector in detect.detectors.items():
+    results.append(run_bench(name, lambda frame, d=detector: d.run(detect.region(frame, d.roi)), corpus))
+  models = {"ocr": detect.ocr_model}
+  for spec in args.model:
+    name, _, path = spec.partition("=")
+    models[name] = load_model(path)
+  rois: dict[str, Box] = {}
+  for spec in args.roi:
+    name, _, box = spec.partition("=")
+    left, top, right, bottom = (int(v) for v in box.split(","))
+    rois[name] = (left, top, right, bottom)
+  for name, model in models.items():
+    if not any(name in expected for _, expected in corpus):
+      continue
+    # same crop, conversion and predict path as detection at runtime
+    results.append(
+      run_bench(
+        name,
+        lambda frame, m=model, n=name: detect.predict(m, to_image(detect.region(frame, rois.get(n))), n),
+        corpus,
+      ),
+    )
+
+  baseline = {}
+  baseline_path = Path(args.baseline) if args.baseline else None
+  if baseline_path is not None and baseline_path.exists() and not args.save_baseline:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+
+  print(format_results(results, baseline))  # noqa: T201
+  if args.save_baseline and baseline_path is not None:
+    baseline_path.write_text(json.dumps({r.name: asdict(r) for r in results}, indent=2), encoding="utf-8")
+    return 0
+
+  regressions = compare(results, baseline, args.tolerance)
+  for message in regressions:
+    print(f"REGRESSION {message}")  # noqa: T201
+  return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
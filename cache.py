@@ -0,0 +1,145 @@
+import hashlib
+import itertools
+import math
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+
+from models.interface import MLProtocol
+
+# regions up to this many pixels are fingerprinted exactly, larger ones on an evenly strided grid
+FINGERPRINT_PIXELS = 128 * 128
+
+
+def content_hash(image: Any) -> bytes:
+  """Hash raw pixel bytes of a PIL image or numpy array."""
+  # both PIL.Image and numpy.ndarray expose tobytes(); shape/size keeps equal buffers of different geometry apart
+  geometry = getattr(image, "shape", None) or (getattr(image, "size", None), getattr(image, "mode", None))
+  h = hashlib.blake2b(repr(geometry).encode(), digest_size=16)
+  h.update(image.tobytes())
+  return h.digest()
+
+
+def region_fingerprint(region: Any) -> bytes:
+  """Cheap change fingerprint of a frame region.
+
+  Small regions hash every pixel. Larger ones, such as a full frame, hash a strided grid of about
+  FINGERPRINT_PIXELS samples, which costs well under a millisecond at 1080p instead of ~18 ms and
+  still catches any change that spans more than one grid step.
+  """
+  array = np.asarray(region)
+  pixels = math.prod(array.shape[:2])
+  if pixels > FINGERPRINT_PIXELS:
+    step = math.ceil(math.sqrt(pixels / FINGERPRINT_PIXELS))
+    array = np.ascontiguousarray(array[::step, ::step])
+  return content_hash(array)
+
+
+# id() of a live model -> (reference to it, token); tokens are never reused, ids are once a model is freed
+_model_tokens: dict[int, tuple[Any, int]] = {}
+_model_counter = itertools.count(1)
+_model_lock = threading.Lock()
+
+
+def _forget_model(key: int, ref: weakref.ref) -> None:
+  with _model_lock:
+    entry = _model_tokens.get(key)
+    if entry is not None and entry[0] is ref:
+      del _model_tokens[key]
+
+
+def model_identity(model: MLProtocol) -> str:
+  """Identify a model instance for cache keys.
+
+  Every instance gets its own token from a counter, so a model loaded at the address of a freed one
+  never hits the old model's cache entries.
+  """
+  key = id(model)
+  with _model_lock:
+    entry = _model_tokens.get(key)
+    if entry is None or entry[0]() is not model:
+      try:
+        ref = weakref.ref(model, lambda ref, key=key: _forget_model(key, ref))
+      except TypeError:
+        # not weakrefable: hold the model so its id cannot be handed to another one
+        ref = lambda model=model: model  # noqa: E731
+      entry = (ref, next(_model_counter))
+      _model_tokens[key] = entry
+  return f"{type(model).__qualname__}#{entry[1]}"
+
+
+class PredictionCache:
+  """LRU cache for model predictions with size and age eviction."""
+
+  def __init__(self, max_size: int = 256, max_age: float = 5.0) -> None:
+    self.max_size = max_size
+    self.max_age = max_age
+    self.hits = 0
+    self.misses = 0
+    self._entries: OrderedDict[tuple[str, bytes], tuple[float, Any]] = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key: tuple[str, bytes]) -> tuple[bool, Any]:
+    """Return (found, value) for key, dropping the entry if it is too old."""
+    now = time.monotonic()
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None and now - entry[0] <= self.max_age:
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return (True, entry[1])
+      if entry is not None:
+        del self._entries[key]
+      self.misses += 1
+      return (False, None)
+
+  def put(self, key: tuple[str, bytes], value: Any) -> None:
+    """Store value and evict least recently used entries over max_size."""
+    with self._lock:
+      self._entries[key] = (time.monotonic(), value)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_size:
+        self._entries.popitem(last=False)
+
+  def lookup(self, model: MLProtocol, image: Any) -> tuple[bool, Any]:
+    """Return (cache hit, prediction) for image."""
+    if self.max_size <= 0:
+      return (False, model.predict(image))
+    key = (model_identity(model), content_hash(image))
+    found, value = self.get(key)
+    if found:
+      return (True, value)
+    value = model.predict(image)
+    self.put(key, value)
+    return (False, value)
+
+  def predict(self, model: MLProtocol, image: Any) -> Any:
+    """Run model.predict on image unless an identical crop was seen recently."""
+    return self.lookup(model, image)[1]
+
+  def clear(self) -> None:
+    """Drop all entries and reset statistics."""
+    with self._lock:
+      self._entries.clear()
+      self.hits = 0
+      self.misses = 0
+
+  @property
+  def hit_rate(self) -> float:
+    """Fraction of lookups served from cache."""
+    total = self.hits + self.misses
+    return self.hits / total if total else 0.0
+
+  @property
+  def miss_rate(self) -> float:
+    """Fraction of lookups that ran the model."""
+    total = self.hits + self.misses
+    return self.misses / total if total else 0.0
+
+  def __len__(self) -> int:
+    """Return the number of cached entries."""
+    return len(self._entries)
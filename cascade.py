@@ -0,0 +1,106 @@
+from collections import Counter
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+import cv2
+import numpy as np
+
+from detect import Detect
+from models.interface import MLProtocol, to_image
+
+StageFn = Callable[[np.ndarray], tuple[Any, float]]
+
+
+@dataclass
+class CascadeStage:
+  """One step of a cascade returning (value, confidence) for a region."""
+
+  name: str
+  run: StageFn
+  threshold: float = 0.9
+
+
+class Cascade:
+  """Run stages from cheapest to most expensive and stop at the first confident answer.
+
+  When no stage is confident the cascade returns default, those calls are counted in undecided.
+  """
+
+  def __init__(self, stages: Iterable[CascadeStage], default: Any = None) -> None:
+    self.stages = list(stages)
+    self.default = default
+    self.exits: Counter[str] = Counter()
+    self.undecided = 0
+
+  def configure(self, thresholds: dict[str, float]) -> None:
+    """Override stage thresholds by stage name."""
+    for stage in self.stages:
+      if stage.name in thresholds:
+        stage.threshold = thresholds[stage.name]
+
+  def __call__(self, region: np.ndarray) -> Any:
+    """Return the value of the first stage confident enough, or default."""
+    for stage in self.stages:
+      value, confidence = stage.run(region)
+      if confidence >= stage.threshold:
+        self.exits[stage.name] += 1
+        return value
+    self.undecided += 1
+    return self.default
+
+  def exit_rates(self) -> dict[str, float]:
+    """Fraction of calls answered by each stage, the rest were undecided."""
+    total = sum(self.exits.values()) + self.undecided
+    return {stage.name: self.exits[stage.name] / total if total else 0.0 for stage in self.stages}
+
+
+def pixel_probe(
+  points: list[tuple[int, int]],
+  colors: list[tuple[int, ...]],
+  value: Any,
+  tolerance: int = 10,
+) -> StageFn:
+  """Check a few pixels against expected colors, confidence is the fraction that match."""
+  xs = np.array([p[0] for p in points])
+  ys = np.array([p[1] for p in points])
+  expected = np.array(colors, dtype=np.int16)
+
+  def run(region: np.ndarray) -> tuple[Any, float]:
+    pixels = region[ys, xs].astype(np.int16)
+    matched = np.all(np.abs(pixels - expected) <= tolerance, axis=-1)
+    return (value, float(matched.mean()))
+
+  return run
+
+
+def thumbnail_match(reference: np.ndarray, value: Any, size: tuple[int, int] = (16, 16)) -> StageFn:
+  """Compare a downscaled region with a downscaled reference image."""
+  thumb = cv2.resize(reference, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+  def run(region: np.ndarray) -> tuple[Any, float]:
+    small = cv2.resize(region, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+    return (value, 1.0 - float(np.abs(small - thumb).mean()) / 255)
+
+  return run
+
+
+def template_match(template: np.ndarray, value: Any) -> StageFn:
+  """Search a region for a template, confidence is the best normalized correlation."""
+
+  def run(region: np.ndarray) -> tuple[Any, float]:
+    if region.shape[0] < template.shape[0] or region.shape[1] < template.shape[1]:
+      return (value, 0.0)
+    scores = cv2.matchTemplate(region, template, cv2.TM_CCOEFF_NORMED)
+    return (value, float(scores.max()))
+
+  return run
+
+
+def model_stage(detect: Detect, model: MLProtocol) -> StageFn:
+  """Run a full model through the prediction cache, always fully confident."""
+
+  def run(region: np.ndarray) -> tuple[Any, float]:
+    return (detect.predict(model, to_image(region)), 1.0)
+
+  return run
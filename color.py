@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+MAX_RANGES = 32
+
+
+@dataclass(frozen=True)
+class HsvRange:
+  """Inclusive HSV range in OpenCV scale (H 0-179, S and V 0-255), hue wraps when h_min > h_max."""
+
+  name: str
+  h_min: int
+  h_max: int
+  s_min: int = 0
+  s_max: int = 255
+  v_min: int = 0
+  v_max: int = 255
+
+
+@dataclass(frozen=True)
+class ColorResult:
+  coverage: float
+  count: int
+  centroids: list[tuple[float, float]]
+
+
+class ColorMaskEngine:
+  """Segment colored UI elements with a BGR lookup table built once from HSV ranges.
+
+  Each table entry holds one bit per range, so every range is evaluated for a pixel with a single
+  lookup. Channels are quantized to bits per channel, so the table has 2**(3 * bits) entries of the
+  smallest unsigned type that fits one bit per range: at the default 6 bits that is 256 KiB for up
+  to 8 ranges, 512 KiB for up to 16 and 1 MiB for up to MAX_RANGES.
+  """
+
+  def __init__(self, ranges: list[HsvRange], bits: int = 6) -> None:
+    if len(ranges) > MAX_RANGES:
+      msg = f"ColorMaskEngine supports at most {MAX_RANGES} ranges"
+      raise ValueError(msg)
+    self.ranges = {r.name: i for i, r in enumerate(ranges)}
+    self.bits = bits
+    self.shift = 8 - bits
+    self.lut = self._build(ranges, np.min_scalar_type((1 << len(ranges)) - 1))
+
+  def _build(self, ranges: list[HsvRange], dtype: np.dtype) -> np.ndarray:
+    levels = 1 << self.bits
+    # center of each quantization bin
+    values = (np.arange(levels, dtype=np.uint16) << self.shift) + (1 << self.shift >> 1)
+    b, g, r = np.meshgrid(values, values, values, indexing="ij")
+    bgr = np.stack([b, g, r], axis=-1).reshape(-1, 1, 3).astype(np.uint8)
+    hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV).reshape(-1, 3).astype(np.int16)
+    h, s, v = hsv[:, 0], hsv[:, 1], hsv[:, 2]
+
+    lut = np.zeros(levels**3, dtype=dtype)
+    for i, c in enumerate(ranges):
+      wraps = c.h_min > c.h_max
+      hue = ((h >= c.h_min) | (h <= c.h_max)) if wraps else ((h >= c.h_min) & (h <= c.h_max))
+      inside = hue & (s >= c.s_min) & (s <= c.s_max) & (v >= c.v_min) & (v <= c.v_max)
+      lut[inside] |= dtype.type(1 << i)
+    return lut
+
+  def labels(self, region: np.ndarray) -> np.ndarray:
+    """Return the per-pixel bitfield of matching ranges for a BGR region."""
+    q = (region >> self.shift).astype(np.uint32)
+    index = (q[..., 0] << (2 * self.bits)) | (q[..., 1] << self.bits) | q[..., 2]
+    return self.lut[index]
+
+  def mask(self, region: np.ndarray, name: str) -> np.ndarray:
+    """Return a uint8 mask (0 or 255) of pixels inside a named range."""
+    bit = 1 << self.ranges[name]
+    return ((self.labels(region) & bit) != 0).astype(np.uint8) * 255
+
+  def analyze(self, region: np.ndarray, name: str, min_area: int = 1) -> ColorResult:
+    """Return coverage, blob count and blob centroids of a named range."""
+    return self._analyze(self.mask(region, name), min_area)
+
+  def analyze_all(self, region: np.ndarray, min_area: int = 1) -> dict[str, ColorResult]:
+    """Analyze every range with one lookup pass over the region."""
+    labels = self.labels(region)
+    return {
+      name: self._analyze(((labels & (1 << i)) != 0).astype(np.uint8) * 255, min_area)
+      for name, i in self.ranges.items()
+    }
+
+  @staticmethod
+  def _analyze(mask: np.ndarray, min_area: int) -> ColorResult:
+    coverage = float(np.count_nonzero(mask)) / mask.size if mask.size else 0.0
+    _, _, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    # label 0 is the background
+    keep = np.flatnonzero(stats[1:, cv2.CC_STAT_AREA] >= min_area) + 1
+    blobs = [(float(centroids[i, 0]), float(centroids[i, 1])) for i in keep]
+    return ColorResult(coverage, len(blobs), blobs)
@@ -37,6 +37,38 @@ class PerformanceSettings(BaseModel):
   bitrate: int = Field(default=12000, gt=0)
 
 
+class DetectionSettings(BaseModel):
+  ocr_model: str = ""
+  mmap_models: bool = False
+  onnx_threads: int = Field(default=1, gt=0)
+  onnx_int8: bool = False
+  inference_server: str = ""
+  cache_size: int = Field(default=256, ge=0)
+  cache_max_age: int = Field(default=5000, ge=0)
+  workers: int = Field(default=0, ge=0)
+  detect_budget: int = Field(default=0, ge=0)
+  profile_dump: str = ""
+  timeline_size: int = Field(default=1024, gt=0)
+
+  @property
+  def mmap_mode(self) -> str | None:
+    """Joblib mmap mode used when loading models."""
+    return "r" if self.mmap_models else None
+
+
+class RateLimit(BaseModel):
+  rate: float = Field(default=0.0, ge=0)
+  burst: int = Field(default=1, gt=0)
+
+
+class ControlLimits(BaseModel):
+  rate: float = Field(default=0.0, ge=0)
+  burst: int = Field(default=5, gt=0)
+  max_wait: int = Field(default=100, ge=0)
+  actions: dict[str, RateLimit] = Field(default_factory=dict)
+  devices: dict[str, dict[str, RateLimit]] = Field(default_factory=dict)
+
+
 class GeneralFlags(BaseModel):
   top_window: bool = False
   restart_app: bool = False
@@ -52,6 +84,8 @@ class AppConfig(BaseModel):
   modes: BotModes = Field(default_factory=BotModes)
   adb: AdbSettings = Field(default_factory=AdbSettings)
   performance: PerformanceSettings = Field(default_factory=PerformanceSettings)
+  detection: DetectionSettings = Field(default_factory=DetectionSettings)
+  control_limits: ControlLimits = Field(default_factory=ControlLimits)
   general: GeneralFlags = Field(default_factory=GeneralFlags)
 
   @classmethod
@@ -1,16 +1,20 @@
-import math
 import time
 from abc import ABC, abstractmethod
 
-import win32api
-import win32con
+import scrcpy
 
 from adb import ADB
+from config import AppConfig
+from gesture import GesturePlan, GesturePlanner, JitterStats, perform, sleep_until
+from mode import ControlMode
+from ratelimit import RateLimiter, limiter
 
 
 class ControlInterface(ABC):
   """Define basic control interface for a game."""
 
+  planner = GesturePlanner()
+
   @abstractmethod
   def adb(self) -> ADB:
     """Dynamically get ADB instance."""
@@ -29,73 +33,153 @@ class ControlInterface(ABC):
 
 
 class ADBControl(ControlInterface):
-  """Control device with adb."""
+  """Control device with adb.
 
-  def adb(self) -> ADB:
-    """Dynamically get ADB instance."""
-    return ADB("")
+  Every action passes the per device rate limiter first, backends override the underscored senders.
+  """
 
-  def tap(self, pos: tuple[int, int]) -> None:
-    """Click on pos[x, y]."""
-    self.adb.click(pos)
+  limiter: RateLimiter = limiter
 
-  def back(self) -> None:
-    """Android BACK event."""
-    self.adb.back()
-
-  def drag(self, src: tuple[int, int], dst: tuple[int, int]) -> None:
-    """Drag from src to dst."""
-    offset_x = src[0] - dst[0]
-    offset_y = src[1] - dst[1]
-    dist = math.sqrt(abs(offset_x) ** 2 + abs(offset_y) ** 2)
-    duration = (dist / 3) * 5 / 1000
-    self.adb.swipe(src, dst, duration)
-
-
-class WIN32Control(ControlInterface):
-  """Control device with WIN32 API."""
-
-  def __init__(self, _hwnd: int) -> None:
-    """Initialize with window number."""
-    self.hwnd = _hwnd
-    if self.hwnd is None:
-      raise Exception("Need hwnd parameter in WIN32API mode")
+  def __init__(self, planner: GesturePlanner | None = None) -> None:
+    """Initialize with the planner that maps frame positions to input coordinates."""
+    # each control owns its planner, the mirror width below depends on the device
+    self.planner = planner or GesturePlanner()
 
   def adb(self) -> ADB:
     """Dynamically get ADB instance."""
     return ADB("")
 
+  def _admit(self, action: str) -> bool:
+    """Sync the planner with the device and take a rate limit token for action."""
+    adb = self.adb()
+    # scrcpy frames of flipped clients are mirrored, positions found in them are mirrored back for input
+    self.planner.mirror_width = adb.get_resolution()[0] if adb.flip and adb.client is not None else 0
+    return self.limiter.acquire(adb.adb_device_code, action)
+
   def tap(self, pos: tuple[int, int]) -> None:
     """Click on pos[x, y]."""
-    click_pos = win32api.MAKELONG(pos[0], pos[1])
-    win32api.PostMessage(self.hwnd, win32con.WM_LBUTTONDOWN, win32con.MK_LBUTTON, click_pos)
-    win32api.PostMessage(self.hwnd, win32con.WM_LBUTTONUP, None, click_pos)
+    if self._admit("tap"):
+      self._tap(pos)
 
   def back(self) -> None:
     """Android BACK event."""
-    # not supported
-
-  def drag_press(self, src: tuple[int, int], dst: tuple[int, int]) -> None:
-    """Drag from src[x,y] to dst[x,y]."""
-    offset = (dst[0] - src[0], dst[1] - src[1])
-    max_value = max(abs(offset[0]), abs(offset[1]))
-    max_value = max_value // 5 if max_value > 60 else max_value // 2
-    step = (offset[0] / max_value, offset[1] / max_value)
-
-    click_pos = win32api.MAKELONG(src[0], src[1])
-    win32api.PostMessage(self.hwnd, win32con.WM_LBUTTONDOWN, win32con.MK_LBUTTON, click_pos)
-
-    for i in range(max_value):
-      click_pos = win32api.MAKELONG(src[0] + int(step[0] * i), src[1] + int(step[1] * i))
-      win32api.PostMessage(self.hwnd, win32con.WM_MOUSEMOVE, win32con.MK_LBUTTON, click_pos)
-      time.sleep(0.001)
-
-  def drag_up(self, dst: tuple[int, int]) -> None:
-    """Drag up."""
-    click_pos = win32api.MAKELONG(dst[0], dst[1])
-    win32api.PostMessage(self.hwnd, win32con.WM_LBUTTONUP, win32con.MK_LBUTTON, click_pos)
+    if self._admit("back"):
+      self._back()
 
   def drag(self, src: tuple[int, int], dst: tuple[int, int]) -> None:
     """Drag from src to dst."""
-    self.drag_press(src, dst)
-    self.drag_up(dst)
+    if self._admit("drag"):
+      self._drag(src, dst)
+
+  def _tap(self, pos: tuple[int, int]) -> None:
+    self.adb().click(self.planner.tap(pos))
+
+  def _back(self) -> None:
+    self.adb().back()
+
+  def _drag(self, src: tuple[int, int], dst: tuple[int, int]) -> None:
+    # shell swipe only takes the end points, the planner still supplies offsets, transform and duration
+    plan = self.planner.drag(src, dst)
+    self.adb().swipe(plan.point(0), plan.point(-1), plan.duration)
+
+
+class ScrcpyControl(ADBControl):
+  """Control device by injecting events through the scrcpy control socket.
+
+  Falls back to adb shell input when no scrcpy client is running. Multi-touch gestures (multi_tap,
+  pinch, hold_drag) are only available on this backend and need a running client.
+  """
+
+  def __init__(self, hold: float = 0.03, planner: GesturePlanner | None = None) -> None:
+    """Initialize with how long a tap is held and the planner for input coordinates and drag paths."""
+    super().__init__(planner)
+    self.hold = hold
+    self.jitter = JitterStats()
+
+  def _tap(self, pos: tuple[int, int]) -> None:
+    adb = self.adb()
+    if adb.client is None:
+      super()._tap(pos)
+      return
+    point = self.planner.tap(pos)
+    up_at = time.perf_counter() + self.hold
+    adb.touch(point, scrcpy.ACTION_DOWN)
+    sleep_until(up_at)
+    adb.touch(point, scrcpy.ACTION_UP)
+
+  def _drag(self, src: tuple[int, int], dst: tuple[int, int]) -> None:
+    adb = self.adb()
+    if adb.client is None:
+      super()._drag(src, dst)
+      return
+    actions = {"down": scrcpy.ACTION_DOWN, "move": scrcpy.ACTION_MOVE, "up": scrcpy.ACTION_UP}
+    perform(self.planner.drag(src, dst), lambda point, action: adb.touch(point, actions[action]), self.jitter)
+
+  def _multi_touch_adb(self) -> ADB:
+    adb = self.adb()
+    if adb.client is None:
+      msg = "Multi-touch gestures need a running scrcpy client"
+      raise RuntimeError(msg)
+    return adb
+
+  def _play_moves(self, adb: ADB, plans: list[GesturePlan], pointer_ids: list[int]) -> None:
+    """Play plans of equal length together, one batched write per step."""
+    start = time.perf_counter()
+    adb.touch_batch([(p.point(0), scrcpy.ACTION_DOWN, i) for p, i in zip(plans, pointer_ids, strict=True)])
+    for step, at in enumerate(plans[0].times[1:].tolist(), 1):
+      due = start + at
+      sleep_until(due)
+      self.jitter.add(time.perf_counter() - due)
+      adb.touch_batch([(p.point(step), scrcpy.ACTION_MOVE, i) for p, i in zip(plans, pointer_ids, strict=True)])
+
+  def multi_tap(self, points: list[tuple[int, int]]) -> None:
+    """Tap several points at the same time."""
+    if not self._admit("multi_tap"):
+      return
+    adb = self._multi_touch_adb()
+    points = self.planner.taps(points)
+    up_at = time.perf_counter() + self.hold
+    adb.touch_batch([(point, scrcpy.ACTION_DOWN, i) for i, point in enumerate(points)])
+    sleep_until(up_at)
+    adb.touch_batch([(point, scrcpy.ACTION_UP, i) for i, point in enumerate(points)])
+
+  def pinch(self, center: tuple[int, int], start_gap: int, end_gap: int) -> None:
+    """Two-finger pinch around center, fingers move from start_gap to end_gap apart horizontally."""
+    if not self._admit("pinch"):
+      return
+    adb = self._multi_touch_adb()
+    x, y = center
+    left_end, right_end = (x - end_gap // 2, y), (x + end_gap // 2, y)
+    left_start, right_start = (x - start_gap // 2, y), (x + start_gap // 2, y)
+    steps = self.planner.steps_for(left_start, left_end)
+    left = self.planner.drag(left_start, left_end, steps)
+    right = self.planner.drag(right_start, right_end, steps)
+
+    self._play_moves(adb, [left, right], [0, 1])
+    adb.touch_batch([(left.point(-1), scrcpy.ACTION_UP, 0), (right.point(-1), scrcpy.ACTION_UP, 1)])
+
+  def hold_drag(self, hold: tuple[int, int], src: tuple[int, int], dst: tuple[int, int]) -> None:
+    """Keep one finger on hold while a second finger drags from src to dst."""
+    if not self._admit("hold_drag"):
+      return
+    adb = self._multi_touch_adb()
+    plan = self.planner.drag(src, dst)
+    # the held finger stays on one offset point for the same number of steps
+    held = self.planner.hold(hold, len(plan.times) - 1)
+
+    self._play_moves(adb, [held, plan], [0, 1])
+    adb.touch_batch([(plan.point(-1), scrcpy.ACTION_UP, 1), (held.point(-1), scrcpy.ACTION_UP, 0)])
+
+
+def create_control(mode: ControlMode, config: AppConfig, hwnd: int | None = None) -> ControlInterface:
+  """Create the control backend for mode with a planner built from the display input settings."""
+  display = config.display_input
+  if mode == ControlMode.WIN32API:
+    # win32 modules only exist on Windows, the adb backends stay importable everywhere
+    from win32_control import WIN32Control  # noqa: PLC0415
+
+    return WIN32Control(hwnd, GesturePlanner.from_config(display, speed=5000.0, interval=0.002))
+  planner = GesturePlanner.from_config(display)
+  if mode == ControlMode.SCRCPY:
+    return ScrcpyControl(planner=planner)
+  return ADBControl(planner)
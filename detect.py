@@ -1,13 +1,326 @@
-import joblib
+import atexit
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any
 
-from models.interface import MLProtocol, MockOCR
+import cv2
+import numpy as np
 
+from cache import PredictionCache, content_hash, model_identity, region_fingerprint
+from config import DetectionSettings
+from features import FeatureLocator
+from mode import Status
+from models.interface import MLProtocol, MockOCR, to_image
+from pool import DetectionPool, FrameRef
+from profiler import Profiler
+from registry import registry
+from roi import Box, CompiledRoi, RoiSchema
+from server import InferenceClient, parse_address
+from timeline import Timeline
 
-def load_model(path: str) -> MLProtocol:
-  return joblib.load(path)
+logger = logging.getLogger(__name__)
+
+
+def load_model(path: str, mmap_mode: str | None = None) -> MLProtocol:
+  """Load a model through the process wide registry."""
+  return registry.get(path, mmap_mode)
+
+
+def crop(frame: Any, box: Box | None) -> np.ndarray:
+  """Cut a (left, top, right, bottom) box out of a frame."""
+  array = np.asarray(frame)
+  if box is None:
+    return array
+  left, top, right, bottom = box
+  return array[top:bottom, left:right]
+
+
+@dataclass
+class Detector:
+  """A detection check bound to the region of the frame it looks at.
+
+  roi is a pixel box or the name of a region in the compiled ROI schema. rate is the desired
+  frequency in Hz (0 runs every tick), cost the expected run time in seconds and trigger an
+  event name that makes the detector run only after that event.
+  """
+
+  name: str
+  run: Callable[[np.ndarray], Any]
+  roi: Box | str | None = None
+  rate: float = 0.0
+  priority: int = 0
+  cost: float = 0.001
+  trigger: str | None = None
+
+
+@dataclass(frozen=True)
+class DetectionResult:
+  value: Any
+  age: float
+  fresh: bool
+
+
+@dataclass
+class _RegionState:
+  fingerprint: bytes
+  value: Any
+  timestamp: float
 
 
 class Detect:
-  def __init__(self) -> None:
-    self.ocr_model = MockOCR
-    pass
+  def __init__(self, settings: DetectionSettings | None = None) -> None:
+    settings = settings or DetectionSettings()
+    self.settings = settings
+    if settings.inference_server:
+      self.ocr_model = InferenceClient(parse_address(settings.inference_server))
+    elif settings.ocr_model:
+      self.ocr_model = load_model(settings.ocr_model, settings.mmap_mode)
+    else:
+      self.ocr_model = MockOCR()
+    self.cache = PredictionCache(settings.cache_size, settings.cache_max_age / 1000)
+    self.pool: DetectionPool | None = None
+    if settings.workers > 0 and settings.ocr_model:
+      self.pool = DetectionPool(
+        {"ocr": (settings.ocr_model, settings.mmap_mode)},
+        settings.workers,
+        onnx_threads=settings.onnx_threads,
+        onnx_int8=settings.onnx_int8,
+      )
+      threading.Thread(target=self.pool.warmup, args=("ocr",), name="pool-warmup", daemon=True).start()
+    self.roi: CompiledRoi | None = None
+    self.status: Status | None = None
+    self.profiler = Profiler()
+    self.timeline = Timeline(settings.timeline_size)
+    if settings.profile_dump:
+      atexit.register(self.profiler.dump, settings.profile_dump)
+    self.detectors: dict[str, Detector] = {}
+    self.locators: dict[str, FeatureLocator] = {}
+    self._locator_sources: dict[str, tuple[str, dict[str, Any]]] = {}
+    self.flip = False
+    self._regions: dict[str, _RegionState] = {}
+
+  def set_status(self, status: Status, seq: int = -1) -> None:
+    """Update the current game status and keep it in the timeline."""
+    self.status = status
+    self.timeline.append("status", status, seq)
+
+  def compile_roi(self, schema: RoiSchema, resolution: tuple[int, int], zoom_ratio: float, *, flip: bool) -> None:
+    """Compile the ROI schema for the connected device, call again after reconnecting."""
+    self.roi = schema.compile(resolution, zoom_ratio, flip=flip)
+    self._regions.clear()
+    if flip != self.flip:
+      self.flip = flip
+      # references are mirrored like the schema templates, so locators are rebuilt for the new mode
+      for name, (reference_path, options) in self._locator_sources.items():
+        self.locators[name] = FeatureLocator(reference_path, flip=flip, **options)
+
+  def add_locator(self, name: str, reference_path: str, **options: Any) -> None:
+    """Match the schema template name by keypoints of reference_path, mirrored like the frames."""
+    self._locator_sources[name] = (reference_path, options)
+    self.locators[name] = FeatureLocator(reference_path, flip=self.flip, **options)
+
+  def region(self, frame: Any, roi: Box | str | None) -> np.ndarray:
+    """Cut a pixel box or a named schema region out of a frame."""
+    if isinstance(roi, str):
+      return self.roi.crop(np.asarray(frame), roi)
+    return crop(frame, roi)
+
+  def locate(self, name: str, frame: Any, threshold: float = 0.8) -> tuple[int, int] | None:
+    """Find a schema template inside its search region and return its center in frame pixels.
+
+    Templates with a FeatureLocator added by add_locator are matched by keypoints, which
+    tolerates the scale differences between resolutions, the rest use template matching.
+    """
+    box = self.roi.box(name)
+    region = self.region(frame, box)
+    if name in self.locators:
+      match = self.locators[name].locate(region)
+      if match is None:
+        return None
+      return (box[0] + round(match.x), box[1] + round(match.y))
+
+    template = self.roi.template(name)
+    if region.shape[0] < template.shape[0] or region.shape[1] < template.shape[1]:
+      return None
+    scores = cv2.matchTemplate(region, template, cv2.TM_CCOEFF_NORMED)
+    _, score, _, (x, y) = cv2.minMaxLoc(scores)
+    if score < threshold:
+      return None
+    return (box[0] + x + template.shape[1] // 2, box[1] + y + template.shape[0] // 2)
+
+  def register(self, detector: Detector) -> None:
+    """Add a detector, replacing any detector with the same name."""
+    self.detectors[detector.name] = detector
+    self._regions.pop(detector.name, None)
+
+  def detect(self, name: str, frame: Any, seq: int = -1) -> DetectionResult:
+    """Run a detector only if its region changed since the last run.
+
+    Every output is also appended to the timeline under the detector name with the frame seq.
+    """
+    detector = self.detectors[name]
+    region = self.region(frame, detector.roi)
+    fingerprint = region_fingerprint(region)
+    now = time.monotonic()
+
+    state = self._regions.get(name)
+    if state is not None and state.fingerprint == fingerprint:
+      self.profiler.record(name, self.status, time.monotonic() - now, state.value, cache_hit=True)
+      self._remember(name, state.value, seq, now)
+      return DetectionResult(state.value, now - state.timestamp, fresh=False)
+
+    value = detector.run(region)
+    self._regions[name] = _RegionState(fingerprint, value, now)
+    self.profiler.record(name, self.status, time.monotonic() - now, value)
+    self._remember(name, value, seq, now)
+    return DetectionResult(value, 0.0, fresh=True)
+
+  def _remember(self, name: str, value: Any, seq: int, timestamp: float) -> None:
+    # the timeline is a side channel, a failed write must never break detection
+    try:
+      self.timeline.append(name, value, seq, timestamp)
+    except Exception:
+      logger.exception("Failed to record '%s' in the timeline", name)
+
+  def detect_all(self, frame: Any, seq: int = -1) -> dict[str, DetectionResult]:
+    """Run every registered detector incrementally on a frame."""
+    return {name: self.detect(name, frame, seq) for name in self.detectors}
+
+  def invalidate(self, name: str | None = None) -> None:
+    """Forget region fingerprints so the next detect call re-runs."""
+    if name is None:
+      self._regions.clear()
+    else:
+      self._regions.pop(name, None)
+
+  def predict(self, model: MLProtocol, image: Any, name: str | None = None) -> Any:
+    """Run a model on an image crop through the prediction cache."""
+    start = time.perf_counter()
+    hit, value = self.cache.lookup(model, image)
+    self.profiler.record(name or type(model).__name__, self.status, time.perf_counter() - start, value, cache_hit=hit)
+    return value
+
+  def ocr(self, image: Any) -> Any:
+    """Read text from an image crop."""
+    return self.predict(self.ocr_model, image, "ocr")
+
+  def publish(self, frame: Any) -> FrameRef | None:
+    """Share a frame with the worker pool once so several ocr_async calls can reuse it."""
+    pool = self.pool
+    return pool.publish(frame) if pool is not None else None
+
+  def ocr_async(self, frame: Any, box: Box | None = None, ref: FrameRef | None = None) -> Future:
+    """Read text from a frame region in a worker process when a pool is configured.
+
+    ref is the FrameRef returned by publish for this frame. Without it the whole frame is copied
+    to shared memory on every call.
+    """
+    region = crop(frame, box)
+    pool = self.pool
+    if pool is None:
+      future = Future()
+      future.set_result(self.predict(self.ocr_model, to_image(region), "ocr"))
+      return future
+
+    # same key as predict() so pool and in-process results share cache entries
+    start = time.perf_counter()
+    key = (model_identity(self.ocr_model), content_hash(to_image(region)))
+    found, value = self.cache.get(key)
+    if found:
+      self.profiler.record("ocr", self.status, time.perf_counter() - start, value, cache_hit=True)
+      future = Future()
+      future.set_result(value)
+      return future
+
+    status = self.status
+
+    def store(done: Future) -> None:
+      if done.cancelled():
+        return
+      result = done.exception() or done.result()
+      # pool jobs are timed from submit to result, queueing included
+      self.profiler.record("ocr", status, time.perf_counter() - start, result)
+      if done.exception() is None:
+        self.cache.put(key, result)
+
+    while True:
+      try:
+        if ref is None or not pool.holds(ref):
+          ref = pool.publish(frame)
+        future = pool.submit("ocr", ref, box)
+        break
+      except ValueError:
+        # the slot of ref was reused for a newer frame, publish this one again
+        ref = None
+      except RuntimeError:
+        # a model swap closed this pool between reading self.pool and submitting, retry on the new one
+        if pool is self.pool or self.pool is None:
+          raise
+        pool = self.pool
+    future.add_done_callback(store)
+    return future
+
+  def _check_model(self, model: MLProtocol, frames: list[tuple[Any, Any]], min_accuracy: float) -> bool:
+    """Warm a model on recorded frames and check it against their expected values, None skips the check."""
+    labeled = 0
+    correct = 0
+    for frame, expected in frames:
+      result = model.predict(to_image(frame))
+      if expected is not None:
+        labeled += 1
+        correct += result == expected
+    return labeled == 0 or correct / labeled >= min_accuracy
+
+  def _swap(self, path: str, frames: list[tuple[Any, Any]], min_accuracy: float) -> MLProtocol:
+    model, info = registry.load(path, self.settings.mmap_mode)
+    if not self._check_model(model, frames, min_accuracy):
+      msg = f"Model '{path}' failed the check on recorded frames, keeping the current model"
+      raise ValueError(msg)
+
+    new_pool = None
+    if self.pool is not None:
+      new_pool = DetectionPool(
+        {"ocr": (path, info.mmap_mode)},
+        self.settings.workers,
+        onnx_threads=self.settings.onnx_threads,
+        onnx_int8=self.settings.onnx_int8,
+      )
+      # bring every worker up on a recorded frame before ocr_async can reach the new pool
+      new_pool.warmup("ocr", frames[0][0] if frames else None)
+
+    # plain attribute assignment is atomic, in-flight calls finish on the model they already hold
+    self.ocr_model = model
+    old_pool, self.pool = self.pool, new_pool
+    registry.put(model, info)
+    if old_pool is not None:
+      # queued predictions on the old pool still finish, only then are its workers and frames released
+      old_pool.close(drain=True)
+    logger.info("Swapped OCR model to '%s'", path)
+    return model
+
+  def swap_model(self, path: str, frames: list[tuple[Any, Any]], min_accuracy: float = 1.0) -> Future:
+    """Load, warm and check a new OCR model in the background, then swap it in without stopping detection.
+
+    frames are (image, expected) pairs recorded from the game. Predictions are cached per model
+    instance so results of the old model are never served for the new one.
+    """
+    future = Future()
+
+    def run() -> None:
+      try:
+        future.set_result(self._swap(path, frames, min_accuracy))
+      except Exception as e:
+        logger.exception("Model swap to '%s' failed", path)
+        future.set_exception(e)
+
+    threading.Thread(target=run, name="model-swap", daemon=True).start()
+    return future
+
+  def close(self) -> None:
+    """Release worker processes."""
+    if self.pool is not None:
+      self.pool.close()
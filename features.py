@@ -0,0 +1,104 @@
+import hashlib
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# color frames are height x width x BGR
+BGR_NDIM = 3
+# Lowe's ratio test compares each match against the second best one
+KNN_PAIR = 2
+
+
+@dataclass(frozen=True)
+class FeatureMatch:
+  x: float
+  y: float
+  scale: float
+  inliers: int
+
+
+class FeatureLocator:
+  """Locate a reference image by ORB keypoints, robust to small scale changes.
+
+  Reference keypoints and descriptors are extracted once and cached in cache_dir, keyed by the
+  image content, the extractor settings and flip. ORB is not mirror invariant, so devices whose
+  frames are mirrored (see RoiSchema.compile) need flip to mirror the reference as well.
+  """
+
+  def __init__(  # noqa: PLR0913
+    self,
+    reference_path: str,
+    cache_dir: str | Path = ".feature_cache",
+    n_features: int = 500,
+    ratio: float = 0.75,
+    min_inliers: int = 8,
+    *,
+    flip: bool = False,
+  ) -> None:
+    self.n_features = n_features
+    self.ratio = ratio
+    self.min_inliers = min_inliers
+    self.flip = flip
+    self.orb = cv2.ORB_create(nfeatures=n_features)
+    self.matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+
+    reference = cv2.imread(reference_path, cv2.IMREAD_GRAYSCALE)
+    if reference is None:
+      msg = f"Cannot read reference image '{reference_path}'"
+      raise FileNotFoundError(msg)
+    if flip:
+      reference = cv2.flip(reference, 1)
+    self.size = (reference.shape[1], reference.shape[0])
+    self.points, self.descriptors = self._load_or_extract(reference, Path(cache_dir))
+
+  def _load_or_extract(self, reference: np.ndarray, cache_dir: Path) -> tuple[np.ndarray, np.ndarray]:
+    digest = hashlib.blake2b(reference.tobytes(), digest_size=16)
+    digest.update(f"{reference.shape}:{self.n_features}:{self.flip}".encode())
+    cache_file = cache_dir / f"{digest.hexdigest()}.npz"
+    if cache_file.exists():
+      cached = np.load(cache_file)
+      return (cached["points"], cached["descriptors"])
+
+    keypoints, descriptors = self.orb.detectAndCompute(reference, None)
+    points = np.array([kp.pt for kp in keypoints], dtype=np.float32).reshape(-1, 2)
+    descriptors = descriptors if descriptors is not None else np.zeros((0, 32), dtype=np.uint8)
+    try:
+      cache_dir.mkdir(parents=True, exist_ok=True)
+      np.savez(cache_file, points=points, descriptors=descriptors)
+    except OSError:
+      logger.warning("Cannot write feature cache '%s'", cache_file)
+    return (points, descriptors)
+
+  def locate(self, region: np.ndarray) -> FeatureMatch | None:
+    """Find the reference in a region, returning its center in region coordinates."""
+    if len(self.descriptors) < self.min_inliers:
+      return None
+    gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY) if region.ndim == BGR_NDIM else region
+    keypoints, descriptors = self.orb.detectAndCompute(gray, None)
+    if descriptors is None or len(keypoints) < self.min_inliers:
+      return None
+
+    good = [
+      pair[0]
+      for pair in self.matcher.knnMatch(self.descriptors, descriptors, k=KNN_PAIR)
+      if len(pair) == KNN_PAIR and pair[0].distance < self.ratio * pair[1].distance
+    ]
+    if len(good) < self.min_inliers:
+      return None
+
+    src = self.points[[m.queryIdx for m in good]]
+    dst = np.array([keypoints[m.trainIdx].pt for m in good], dtype=np.float32)
+    # similarity transform is enough for UI elements that are only scaled and shifted
+    transform, inliers = cv2.estimateAffinePartial2D(src, dst, method=cv2.RANSAC)
+    if transform is None or int(inliers.sum()) < self.min_inliers:
+      return None
+
+    center = np.array([self.size[0] / 2, self.size[1] / 2, 1.0])
+    x, y = transform @ center
+    scale = float(np.hypot(transform[0, 0], transform[1, 0]))
+    return FeatureMatch(float(x), float(y), scale, int(inliers.sum()))
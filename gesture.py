@@ -0,0 +1,184 @@
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from config import DisplayInputAdjust
+
+# time.sleep can overshoot by about a millisecond, the final stretch before a deadline is spun instead
+SPIN_THRESHOLD = 0.002
+SPIN_MARGIN = 0.001
+
+
+def ease_in_out(t: np.ndarray) -> np.ndarray:
+  """Smoothstep easing, slow at both ends so the drag starts and lands gently."""
+  return t * t * (3 - 2 * t)
+
+
+def sleep_until(deadline: float) -> None:
+  """Sleep until a perf_counter deadline, spinning for the last millisecond to avoid oversleeping."""
+  remaining = deadline - time.perf_counter()
+  if remaining > SPIN_THRESHOLD:
+    time.sleep(remaining - SPIN_MARGIN)
+  while time.perf_counter() < deadline:
+    pass
+
+
+@dataclass(frozen=True)
+class GesturePlan:
+  """Input coordinates of every touch point and when to send it, in seconds from the start.
+
+  points[0] is the press position and points[-1] the release position.
+  """
+
+  points: np.ndarray
+  times: np.ndarray
+
+  @property
+  def duration(self) -> float:
+    """Time from press to release."""
+    return float(self.times[-1])
+
+  def point(self, index: int) -> tuple[int, int]:
+    """Return one point as an (x, y) tuple of ints."""
+    x, y = self.points[index].tolist()
+    return (x, y)
+
+
+class GesturePlanner:
+  """Compute drag paths for any control backend in one vectorized step.
+
+  Positions are given in frame coordinates and divided by zoom_ratio to get input coordinates,
+  backends send taps through the same transform. When the frames are mirrored (ADB.flip, see
+  RoiSchema.compile) mirror_width is the device width and x is mirrored back into input space.
+  Every tap and both drag ends are moved by up to random_offset pixels, the path bends sideways
+  by smoothness times its length and progress along it follows easing.
+  """
+
+  def __init__(  # noqa: PLR0913
+    self,
+    *,
+    speed: float = 600.0,
+    interval: float = 0.008,
+    smoothness: float = 0.0,
+    random_offset: int = 0,
+    zoom_ratio: float = 1.0,
+    easing: Callable[[np.ndarray], np.ndarray] = ease_in_out,
+    seed: int | None = None,
+  ) -> None:
+    self.speed = speed
+    self.interval = interval
+    self.smoothness = smoothness
+    self.random_offset = random_offset
+    self.zoom_ratio = zoom_ratio
+    self.mirror_width = 0
+    self.easing = easing
+    self.rng = np.random.default_rng(seed)
+
+  @classmethod
+  def from_config(cls, display: DisplayInputAdjust, **kwargs: Any) -> "GesturePlanner":
+    """Build a planner with the zoom ratio and random offset from the display settings."""
+    return cls(random_offset=display.random_offset, zoom_ratio=display.zoom_ratio, **kwargs)
+
+  def transform(self, positions: Any, *, offset: bool = True) -> np.ndarray:
+    """Map frame positions of shape (n, 2) to input coordinates, each moved by its own random offset."""
+    points = np.array(positions, dtype=np.float64).reshape(-1, 2)
+    if offset and self.random_offset > 0:
+      points += self.rng.integers(-self.random_offset, self.random_offset + 1, size=points.shape)
+    points /= self.zoom_ratio
+    if self.mirror_width > 0:
+      points[:, 0] = self.mirror_width - points[:, 0]
+    return points
+
+  def tap(self, pos: tuple[int, int]) -> tuple[int, int]:
+    """Return the input coordinates for a tap on a frame position."""
+    x, y = np.rint(self.transform([pos])[0]).astype(int).tolist()
+    return (x, y)
+
+  def taps(self, positions: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Return input coordinates for several simultaneous taps."""
+    return [(x, y) for x, y in np.rint(self.transform(positions)).astype(int).tolist()]
+
+  def hold(self, pos: tuple[int, int], steps: int) -> GesturePlan:
+    """Plan a finger resting on pos for steps moves, offset once so it does not slide."""
+    point = np.rint(self.transform([pos])).astype(np.int32)
+    return GesturePlan(np.repeat(point, steps + 1, axis=0), np.arange(steps + 1, dtype=np.float64) * self.interval)
+
+  def steps_for(self, src: tuple[int, int], dst: tuple[int, int]) -> int:
+    """Return the number of move events a drag between two frame points takes."""
+    distance = math.dist(src, dst) / self.zoom_ratio
+    return max(round(distance / self.speed / self.interval), 1)
+
+  def drag(self, src: tuple[int, int], dst: tuple[int, int], steps: int | None = None) -> GesturePlan:
+    """Plan a drag from src to dst, steps overrides the count derived from speed."""
+    steps = steps or self.steps_for(src, dst)
+    start, end = self.transform([src, dst])
+
+    delta = end - start
+    control = (start + end) / 2 + np.array([-delta[1], delta[0]]) * self.smoothness
+    t = self.easing(np.linspace(0.0, 1.0, steps + 1))[:, None]
+    u = 1 - t
+    points = u * u * start + 2 * u * t * control + t * t * end
+    times = np.arange(steps + 1, dtype=np.float64) * self.interval
+    return GesturePlan(np.rint(points).astype(np.int32), times)
+
+
+def perform(
+  plan: GesturePlan,
+  send: Callable[[tuple[int, int], str], None],
+  jitter: "JitterStats | None" = None,
+) -> None:
+  """Play a plan through send(point, action) with action "down", "move" or "up".
+
+  The press goes out immediately, each move at its planned time and the release right after the
+  last move. The lateness of every move is added to jitter.
+  """
+  start = time.perf_counter()
+  send(plan.point(0), "down")
+  for step, at in enumerate(plan.times[1:].tolist(), 1):
+    due = start + at
+    sleep_until(due)
+    if jitter is not None:
+      jitter.add(time.perf_counter() - due)
+    send(plan.point(step), "move")
+  send(plan.point(-1), "up")
+
+
+class JitterStats:
+  """Keep the recent lateness of scheduled input events."""
+
+  def __init__(self, size: int = 1000) -> None:
+    self.samples: deque[float] = deque(maxlen=size)
+    self._lock = threading.Lock()
+
+  def add(self, lateness: float) -> None:
+    """Record how late an event was sent, in seconds."""
+    with self._lock:
+      self.samples.append(lateness)
+
+  def percentile(self, q: float) -> float:
+    """Return a lateness percentile (0-1) in seconds."""
+    with self._lock:
+      ordered = sorted(self.samples)
+    if not ordered:
+      return 0.0
+    return ordered[min(math.ceil(q * len(ordered)) - 1, len(ordered) - 1)] if q > 0 else ordered[0]
+
+  def summary(self) -> dict[str, float]:
+    """Return count, mean, p50, p99 and max lateness in milliseconds."""
+    with self._lock:
+      samples = list(self.samples)
+    if not samples:
+      return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+      "count": len(samples),
+      "mean_ms": sum(samples) / len(samples) * 1000,
+      "p50_ms": self.percentile(0.5) * 1000,
+      "p99_ms": self.percentile(0.99) * 1000,
+      "max_ms": max(samples) * 1000,
+    }
@@ -0,0 +1,52 @@
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+
+class FrameHub:
+  """Latest-frame mailbox shared by the decoder thread and everything that reads frames.
+
+  Every published frame gets an increasing sequence number and a monotonic timestamp.
+  """
+
+  def __init__(self) -> None:
+    self.seq = 0
+    self.timestamp = 0.0
+    self.frame: Any = None
+    self._listeners: list[Callable[[int, float, Any], None]] = []
+    self._cond = threading.Condition()
+
+  def publish(self, frame: Any) -> None:
+    """Store a new frame, wake waiters and call listeners."""
+    with self._cond:
+      self.seq += 1
+      self.timestamp = time.monotonic()
+      self.frame = frame
+      seq, timestamp = self.seq, self.timestamp
+      listeners = list(self._listeners)
+      self._cond.notify_all()
+    for listener in listeners:
+      listener(seq, timestamp, frame)
+
+  def add_listener(self, listener: Callable[[int, float, Any], None]) -> None:
+    """Call listener(seq, timestamp, frame) on the decoder thread for every frame."""
+    with self._cond:
+      self._listeners.append(listener)
+
+  def remove_listener(self, listener: Callable[[int, float, Any], None]) -> None:
+    """Stop calling a listener."""
+    with self._cond:
+      self._listeners.remove(listener)
+
+  def latest(self) -> tuple[int, float, Any]:
+    """Return (seq, timestamp, frame) of the newest frame."""
+    with self._cond:
+      return (self.seq, self.timestamp, self.frame)
+
+  def wait_next(self, after_seq: int, timeout: float) -> tuple[int, float, Any] | None:
+    """Block until a frame newer than after_seq arrives, None on timeout."""
+    with self._cond:
+      if not self._cond.wait_for(lambda: self.seq > after_seq, timeout):
+        return None
+      return (self.seq, self.timestamp, self.frame)
@@ -0,0 +1,117 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from adb import ADB
+from cache import region_fingerprint
+from control import ControlInterface
+from hub import FrameHub
+from roi import Box
+
+
+@dataclass
+class _Pending:
+  kind: str
+  box: Box | None
+  fingerprint: bytes
+  started: float
+
+
+class LatencyProbe:
+  """Measure the time from an input action to the first frame where its target region changes."""
+
+  def __init__(self, hub: FrameHub, device: str = "", radius: int = 40, timeout: float = 2.0) -> None:
+    self.hub = hub
+    self.device = device
+    self.radius = radius
+    self.timeout = timeout
+    self.samples: dict[tuple[str, str], list[float]] = {}
+    self.timeouts: dict[tuple[str, str], int] = {}
+    self._pending: list[_Pending] = []
+    self._lock = threading.Lock()
+    hub.add_listener(self._on_frame)
+
+  def box_around(self, pos: tuple[int, int]) -> Box:
+    """Return the square region watched for a tap or drag end at pos."""
+    return (max(pos[0] - self.radius, 0), max(pos[1] - self.radius, 0), pos[0] + self.radius, pos[1] + self.radius)
+
+  @staticmethod
+  def _fingerprint(frame: Any, box: Box | None) -> bytes:
+    # runs on the decoder thread for every frame, so large regions are sampled instead of hashed whole
+    region = np.asarray(frame)
+    if box is not None:
+      region = region[box[1] : box[3], box[0] : box[2]]
+    return region_fingerprint(region)
+
+  def mark(self, kind: str, box: Box | None) -> None:
+    """Start timing an action that is about to be sent, box None watches the whole frame."""
+    _, _, frame = self.hub.latest()
+    if frame is None:
+      return
+    pending = _Pending(kind, box, self._fingerprint(frame, box), time.monotonic())
+    with self._lock:
+      self._pending.append(pending)
+
+  def _on_frame(self, _: int, timestamp: float, frame: Any) -> None:
+    with self._lock:
+      if not self._pending:
+        return
+      still_pending = []
+      for p in self._pending:
+        key = (self.device, p.kind)
+        if timestamp - p.started > self.timeout:
+          self.timeouts[key] = self.timeouts.get(key, 0) + 1
+        elif timestamp > p.started and self._fingerprint(frame, p.box) != p.fingerprint:
+          self.samples.setdefault(key, []).append(timestamp - p.started)
+        else:
+          still_pending.append(p)
+      self._pending = still_pending
+
+  def summary(self) -> dict[tuple[str, str], dict[str, float]]:
+    """Return count, timeouts and p50/p90/p99 latency in ms per (device, action type)."""
+    with self._lock:
+      keys = set(self.samples) | set(self.timeouts)
+      result = {}
+      for key in keys:
+        samples = self.samples.get(key, [])
+        p50, p90, p99 = np.percentile(samples, [50, 90, 99]) * 1000 if samples else (0.0, 0.0, 0.0)
+        result[key] = {
+          "count": len(samples),
+          "timeouts": self.timeouts.get(key, 0),
+          "p50_ms": float(p50),
+          "p90_ms": float(p90),
+          "p99_ms": float(p99),
+        }
+      return result
+
+
+class InstrumentedControl(ControlInterface):
+  """Forward actions to another control and time their visual response with a LatencyProbe."""
+
+  def __init__(self, control: ControlInterface, probe: LatencyProbe) -> None:
+    """Wrap control."""
+    self.control = control
+    self.probe = probe
+
+  def adb(self) -> ADB:
+    """Dynamically get ADB instance."""
+    return self.control.adb()
+
+  def tap(self, pos: tuple[int, int]) -> None:
+    """Click on pos[x, y]."""
+    self.probe.mark("tap", self.probe.box_around(pos))
+    self.control.tap(pos)
+
+  def back(self) -> None:
+    """Android BACK event."""
+    self.probe.mark("back", None)
+    self.control.back()
+
+  def drag(self, src: tuple[int, int], dst: tuple[int, int]) -> None:
+    """Drag from src to dst."""
+    self.control.drag(src, dst)
+    # the drag blocks until the release, timing from the press would add the gesture duration
+    self.probe.mark("drag", self.probe.box_around(dst))
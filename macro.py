@@ -0,0 +1,139 @@
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from adb import ADB
+from config import AppConfig
+from control import ControlInterface, create_control
+from gesture import sleep_until
+from mode import ControlMode
+
+MAGIC = b"MGM1"
+HEADER = struct.Struct("<4sI")
+EVENT = struct.Struct("<BI")
+POINT = struct.Struct("<HH")
+OPS = ("tap", "drag", "back")
+SCALE = 0xFFFF
+
+
+@dataclass(frozen=True)
+class MacroEvent:
+  """A recorded action, delay in ms since the previous one and coordinates normalized to 0-1."""
+
+  op: str
+  delay: int
+  points: tuple[tuple[float, float], ...]
+
+
+@dataclass(frozen=True)
+class TimedEvent:
+  at: float
+  op: str
+  args: tuple[tuple[int, int], ...]
+
+
+class Macro:
+  """A sequence of actions stored in a compact binary format.
+
+  Each event is an op byte, a uint32 delay in ms and one uint16 x/y pair per point.
+  """
+
+  def __init__(self, events: list[MacroEvent] | None = None) -> None:
+    self.events = events or []
+
+  def to_bytes(self) -> bytes:
+    """Encode the macro."""
+    chunks = [HEADER.pack(MAGIC, len(self.events))]
+    for event in self.events:
+      chunks.append(EVENT.pack(OPS.index(event.op), event.delay))
+      chunks.extend(POINT.pack(round(x * SCALE), round(y * SCALE)) for x, y in event.points)
+    return b"".join(chunks)
+
+  @classmethod
+  def from_bytes(cls, data: bytes) -> "Macro":
+    """Decode a macro."""
+    magic, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+      msg = "Not a macro file"
+      raise ValueError(msg)
+    offset = HEADER.size
+    events = []
+    for _ in range(count):
+      op_index, delay = EVENT.unpack_from(data, offset)
+      offset += EVENT.size
+      op = OPS[op_index]
+      points = []
+      for _ in range({"tap": 1, "drag": 2, "back": 0}[op]):
+        x, y = POINT.unpack_from(data, offset)
+        offset += POINT.size
+        points.append((x / SCALE, y / SCALE))
+      events.append(MacroEvent(op, delay, tuple(points)))
+    return cls(events)
+
+  def save(self, file_path: str | Path) -> None:
+    """Write the macro to a file."""
+    Path(file_path).write_bytes(self.to_bytes())
+
+  @classmethod
+  def load(cls, file_path: str | Path) -> "Macro":
+    """Read a macro from a file."""
+    return cls.from_bytes(Path(file_path).read_bytes())
+
+  def compile(self, resolution: tuple[int, int], speed: float = 1.0) -> list[TimedEvent]:
+    """Resolve every event to pixels and an absolute offset in seconds, speed > 1 plays faster."""
+    width, height = resolution
+    timeline = []
+    at = 0.0
+    for event in self.events:
+      at += event.delay / 1000 / speed
+      points = tuple((round(x * (width - 1)), round(y * (height - 1))) for x, y in event.points)
+      timeline.append(TimedEvent(at, event.op, points))
+    return timeline
+
+
+def play(timeline: list[TimedEvent], control: ControlInterface | None = None) -> None:
+  """Send a compiled macro on its schedule, by default through the scrcpy control socket."""
+  control = control or create_control(ControlMode.SCRCPY, AppConfig.load_from_file())
+  start = time.perf_counter()
+  for event in timeline:
+    sleep_until(start + event.at)
+    getattr(control, event.op)(*event.args)
+
+
+class MacroRecorder(ControlInterface):
+  """Forward actions to another control and record them with their relative timing."""
+
+  def __init__(self, control: ControlInterface, resolution: tuple[int, int]) -> None:
+    """Wrap control, coordinates are normalized by resolution."""
+    self.control = control
+    self.resolution = resolution
+    self.macro = Macro()
+    self._last: float | None = None
+
+  def _record(self, op: str, *points: tuple[int, int]) -> None:
+    now = time.perf_counter()
+    delay = 0 if self._last is None else round((now - self._last) * 1000)
+    self._last = now
+    width, height = self.resolution
+    normalized = tuple((x / (width - 1), y / (height - 1)) for x, y in points)
+    self.macro.events.append(MacroEvent(op, delay, normalized))
+
+  def adb(self) -> ADB:
+    """Dynamically get ADB instance."""
+    return self.control.adb()
+
+  def tap(self, pos: tuple[int, int]) -> None:
+    """Click on pos[x, y]."""
+    self._record("tap", pos)
+    self.control.tap(pos)
+
+  def back(self) -> None:
+    """Android BACK event."""
+    self._record("back")
+    self.control.back()
+
+  def drag(self, src: tuple[int, int], dst: tuple[int, int]) -> None:
+    """Drag from src to dst."""
+    self._record("drag", src, dst)
+    self.control.drag(src, dst)
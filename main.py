@@ -4,11 +4,26 @@ from adb import ADB
 from config import AppConfig
 from GUI.app import AppGUI
 from log import setup_logger
+from ratelimit import limiter
+from registry import registry
 
 if __name__ == "__main__":
   logger, log_queue = setup_logger(gui_log_handler_enabled=True)
   config = AppConfig.load_from_file("config.toml")
   adb = ADB(config.general.package)
+  registry.configure_onnx(config.detection.onnx_threads, int8=config.detection.onnx_int8)
+  limits = config.control_limits
+  limiter.configure(
+    (limits.rate, limits.burst),
+    {action: (limit.rate, limit.burst) for action, limit in limits.actions.items()},
+    {
+      device: {action: (limit.rate, limit.burst) for action, limit in actions.items()}
+      for device, actions in limits.devices.items()
+    },
+    limits.max_wait / 1000,
+  )
+  if config.detection.ocr_model:
+    registry.warmup_async([config.detection.ocr_model], config.detection.mmap_mode)
   root = tk.Tk()
   app = AppGUI(root, config, adb)
   root.mainloop()
@@ -4,6 +4,7 @@ from enum import IntEnum
 class ControlMode(IntEnum):
   WIN32API = 0
   ADB = 1
+  SCRCPY = 2
 
 
 class Emulator(IntEnum):
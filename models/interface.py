@@ -1,14 +1,30 @@
 from typing import Any, Protocol
 
+import numpy as np
 from PIL import Image
 
 
+def to_image(region: Any) -> Image.Image:
+  """Convert a frame crop to the image handed to models.
+
+  Crops keep the channel order of the frame (BGR for scrcpy frames). Every detection path and the
+  benchmark go through here so a model always sees the same input.
+  """
+  return region if isinstance(region, Image.Image) else Image.fromarray(np.asarray(region))
+
+
 class MLProtocol(Protocol):
   """A protocol for machine learning models."""
 
   def predict(self, image: Image.Image) -> Any: ...
 
 
+class BatchMLProtocol(MLProtocol, Protocol):
+  """A model that can also predict several images in one call."""
+
+  def predict_batch(self, images: list[Image.Image]) -> list[Any]: ...
+
+
 class MockOCR:
   def predict(self, _: Image.Image) -> Any:
     """Mock prediction method that returns a fixed string."""
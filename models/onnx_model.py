@@ -0,0 +1,91 @@
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+
+class OnnxModel:
+  """Run an exported ONNX model on CPU with onnxruntime.
+
+  Images are converted to RGB float32 in [0, 1], resized to the model input when its size is
+  static and fed as NCHW. predict returns the label of the best class when labels are given,
+  otherwise the first output row.
+  """
+
+  def __init__(
+    self,
+    path: str,
+    threads: int = 1,
+    *,
+    optimize: bool = True,
+    int8: bool = False,
+    labels: list[str] | None = None,
+  ) -> None:
+    try:
+      import onnxruntime as ort  # noqa: PLC0415
+    except ImportError as e:
+      msg = "onnxruntime is required to load .onnx models, install it with 'pip install onnxruntime'"
+      raise ImportError(msg) from e
+
+    if int8:
+      path = str(self.quantize(path))
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = (
+      ort.GraphOptimizationLevel.ORT_ENABLE_ALL if optimize else ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+    )
+    self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+    self.path = path
+    self.labels = labels
+
+    model_input = self.session.get_inputs()[0]
+    self.input_name = model_input.name
+    height, width = model_input.shape[2:4]
+    self.input_size = (width, height) if isinstance(width, int) and isinstance(height, int) else None
+
+  @staticmethod
+  def quantize(path: str) -> Path:
+    """Write int8 weights next to the model once and return their path."""
+    source = Path(path)
+    target = source.with_suffix(".int8.onnx")
+    if not target.exists() or target.stat().st_mtime < source.stat().st_mtime:
+      from onnxruntime.quantization import QuantType, quantize_dynamic  # noqa: PLC0415
+
+      quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+    return target
+
+  def _prepare(self, image: Any) -> np.ndarray:
+    if not isinstance(image, Image.Image):
+      image = Image.fromarray(np.asarray(image))
+    image = image.convert("RGB")
+    if self.input_size is not None and image.size != self.input_size:
+      image = image.resize(self.input_size, Image.BILINEAR)
+    return (np.asarray(image, dtype=np.float32) / 255).transpose(2, 0, 1)
+
+  def _decode(self, row: np.ndarray) -> Any:
+    if self.labels is not None:
+      return self.labels[int(np.argmax(row))]
+    return row
+
+  def predict_batch(self, images: list[Any]) -> list[Any]:
+    """Run several images through the model, one session call per distinct input shape."""
+    prepared = [self._prepare(image) for image in images]
+    # models with dynamic height/width see crops as they are, which need not stack together
+    groups: dict[tuple[int, ...], list[int]] = {}
+    for i, array in enumerate(prepared):
+      groups.setdefault(array.shape, []).append(i)
+    results: list[Any] = [None] * len(prepared)
+    for indices in groups.values():
+      batch = np.stack([prepared[i] for i in indices])
+      output = self.session.run(None, {self.input_name: batch})[0]
+      for i, row in zip(indices, output, strict=True):
+        results[i] = self._decode(row)
+    return results
+
+  def predict(self, image: Image.Image) -> Any:
+    """Run the model on a single image."""
+    return self.predict_batch([image])[0]
@@ -0,0 +1,188 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+
+from models.interface import MLProtocol, to_image
+from registry import registry
+from roi import Box
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FrameRef:
+  """Reference to a frame published in shared memory, generation tells reuses of a slot apart."""
+
+  name: str
+  shape: tuple[int, ...]
+  dtype: str
+  generation: int = 0
+
+
+# per worker process state
+_worker_models: dict[str, MLProtocol] = {}
+_worker_buffers: dict[str, shared_memory.SharedMemory] = {}
+
+
+def _init_worker(models: dict[str, tuple[str, str | None]], onnx_threads: int, onnx_int8: bool) -> None:  # noqa: FBT001
+  registry.configure_onnx(onnx_threads, int8=onnx_int8)
+  for name, (path, mmap_mode) in models.items():
+    _worker_models[name] = registry.get(path, mmap_mode)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+  shm = _worker_buffers.get(name)
+  if shm is None:
+    # workers share the parent's resource tracker, so the parent's unlink stays the only cleanup
+    shm = shared_memory.SharedMemory(name=name)
+    _worker_buffers[name] = shm
+  return shm
+
+
+def _predict(model_name: str, ref: FrameRef, box: Box | None) -> Any:
+  frame = np.ndarray(ref.shape, dtype=ref.dtype, buffer=_attach(ref.name).buf)
+  if box is not None:
+    left, top, right, bottom = box
+    frame = frame[top:bottom, left:right]
+  return _worker_models[model_name].predict(to_image(frame))
+
+
+def _warm(model_name: str, sample: np.ndarray) -> int:
+  _worker_models[model_name].predict(to_image(sample))
+  # stay busy a moment so the next warm-up job lands on another worker
+  time.sleep(0.05)
+  return os.getpid()
+
+
+class _Slot:
+  def __init__(self, nbytes: int) -> None:
+    self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    self.pending: list[Future] = []
+    self.generation = -1
+
+  def release(self) -> None:
+    self.shm.close()
+    self.shm.unlink()
+
+
+class DetectionPool:
+  """Run model predictions in worker processes on frames shared through shared memory.
+
+  A frame is published once and any number of crops of it can be submitted. A FrameRef stays
+  valid until slots more frames have been published.
+  """
+
+  def __init__(
+    self,
+    models: dict[str, tuple[str, str | None]],
+    workers: int = 2,
+    slots: int = 4,
+    *,
+    onnx_threads: int = 1,
+    onnx_int8: bool = False,
+  ) -> None:
+    # spawned workers start with a fresh registry, the ONNX options have to travel with them
+    self._executor = ProcessPoolExecutor(
+      max_workers=workers,
+      mp_context=multiprocessing.get_context("spawn"),
+      initializer=_init_worker,
+      initargs=(models, onnx_threads, onnx_int8),
+    )
+    self.workers = workers
+    self._slots: list[_Slot | None] = [None] * slots
+    self._next = 0
+    self._generation = 0
+    self._closed = False
+    self._lock = threading.Lock()
+
+  def _check_open(self) -> None:
+    if self._closed:
+      msg = "DetectionPool is closed"
+      raise RuntimeError(msg)
+
+  def publish(self, frame: Any) -> FrameRef:
+    """Copy a frame into the next shared memory slot and return a reference to it."""
+    array = np.ascontiguousarray(frame)
+    with self._lock:
+      self._check_open()
+      slot = self._slots[self._next]
+      if slot is not None:
+        # never overwrite a frame that workers are still reading
+        wait(slot.pending)
+        slot.pending.clear()
+        if slot.shm.size < array.nbytes:
+          slot.release()
+          slot = None
+      if slot is None:
+        slot = _Slot(array.nbytes)
+        self._slots[self._next] = slot
+      np.ndarray(array.shape, dtype=array.dtype, buffer=slot.shm.buf)[...] = array
+      self._generation += 1
+      slot.generation = self._generation
+      ref = FrameRef(slot.shm.name, array.shape, array.dtype.str, slot.generation)
+      self._next = (self._next + 1) % len(self._slots)
+      return ref
+
+  def _slot_for(self, ref: FrameRef) -> _Slot | None:
+    for slot in self._slots:
+      if slot is not None and slot.shm.name == ref.name and slot.generation == ref.generation:
+        return slot
+    return None
+
+  def holds(self, ref: FrameRef) -> bool:
+    """Check whether ref still points at the frame it was published with."""
+    with self._lock:
+      return self._slot_for(ref) is not None
+
+  def submit(self, model_name: str, ref: FrameRef, box: Box | None = None) -> Future:
+    """Queue a prediction on a published frame, the result arrives asynchronously.
+
+    Raises ValueError when the slot of ref was reused for a newer frame since it was published.
+    """
+    with self._lock:
+      self._check_open()
+      slot = self._slot_for(ref)
+      if slot is None:
+        msg = f"Frame {ref.name} generation {ref.generation} was overwritten, publish it again"
+        raise ValueError(msg)
+      # registered under the lock so publish cannot overwrite the slot before the worker is done
+      future = self._executor.submit(_predict, model_name, ref, box)
+      slot.pending.append(future)
+    return future
+
+  def warmup(self, model_name: str, sample: Any = None, timeout: float = 120.0) -> int:
+    """Start every worker and run one prediction on each, returns how many answered.
+
+    Workers are spawned lazily and load their models on start, without this the first
+    predictions after creating a pool wait for process start, imports and the model load.
+    """
+    sample = np.zeros((32, 32, 3), dtype=np.uint8) if sample is None else np.asarray(sample)
+    deadline = time.monotonic() + timeout
+    pids: set[int] = set()
+    while len(pids) < self.workers and time.monotonic() < deadline:
+      futures = [self._executor.submit(_warm, model_name, sample) for _ in range(self.workers - len(pids))]
+      done, _ = wait(futures, timeout=max(deadline - time.monotonic(), 0))
+      pids.update(f.result() for f in done if f.exception() is None)
+      if any(f.exception() is not None for f in done):
+        logger.warning("Worker warm-up of '%s' failed", model_name)
+        break
+    return len(pids)
+
+  def close(self, *, drain: bool = False) -> None:
+    """Stop workers and free shared memory, with drain queued predictions finish instead of being cancelled."""
+    with self._lock:
+      self._closed = True
+    self._executor.shutdown(wait=True, cancel_futures=not drain)
+    with self._lock:
+      for slot in self._slots:
+        if slot is not None:
+          slot.release()
+      self._slots = [None] * len(self._slots)
@@ -0,0 +1,111 @@
+import bisect
+import json
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from mode import Status
+
+logger = logging.getLogger(__name__)
+
+# latency histogram upper bounds in seconds, the last bucket catches everything slower
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+MAX_DISTINCT_RESULTS = 20
+
+
+@dataclass
+class CallStats:
+  count: int = 0
+  total: float = 0.0
+  worst: float = 0.0
+  cache_hits: int = 0
+  histogram: list[int] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+  results: Counter[str] = field(default_factory=Counter)
+
+  def add(self, elapsed: float, result: Any, *, cache_hit: bool) -> None:
+    """Add one call."""
+    self.count += 1
+    self.total += elapsed
+    self.worst = max(self.worst, elapsed)
+    self.cache_hits += cache_hit
+    self.histogram[bisect.bisect_left(BUCKETS, elapsed)] += 1
+    label = repr(result)[:40]
+    if label not in self.results and len(self.results) >= MAX_DISTINCT_RESULTS:
+      label = "<other>"
+    self.results[label] += 1
+
+  def percentile(self, q: float) -> float:
+    """Approximate a latency percentile by the upper bound of its histogram bucket."""
+    if self.count == 0:
+      return 0.0
+    target = q * self.count
+    seen = 0
+    for i, n in enumerate(self.histogram):
+      seen += n
+      if seen >= target:
+        return BUCKETS[i] if i < len(BUCKETS) else self.worst
+    return self.worst
+
+
+class Profiler:
+  """Collect call count, latency, cache hits and results per detector and game status."""
+
+  def __init__(self) -> None:
+    self.stats: dict[tuple[str, str], CallStats] = {}
+    self._lock = threading.Lock()
+
+  def record(self, name: str, status: Status | None, elapsed: float, result: Any, *, cache_hit: bool = False) -> None:
+    """Record one detector or model call."""
+    key = (name, status.name if status is not None else "-")
+    with self._lock:
+      stats = self.stats.get(key)
+      if stats is None:
+        stats = self.stats[key] = CallStats()
+      stats.add(elapsed, result, cache_hit=cache_hit)
+
+  def table(self) -> list[dict[str, Any]]:
+    """Return one row per (name, status), slowest total time first."""
+    with self._lock:
+      items = sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True)
+      return [
+        {
+          "name": name,
+          "status": status,
+          "count": s.count,
+          "total_ms": s.total * 1000,
+          "mean_ms": s.total / s.count * 1000 if s.count else 0.0,
+          "p50_ms": s.percentile(0.5) * 1000,
+          "p95_ms": s.percentile(0.95) * 1000,
+          "max_ms": s.worst * 1000,
+          "cache_hit_rate": s.cache_hits / s.count if s.count else 0.0,
+          "results": dict(s.results.most_common()),
+        }
+        for (name, status), s in items
+      ]
+
+  def format_table(self) -> str:
+    """Render the table as aligned text."""
+    lines = [f"{'name':<24}{'status':<18}{'count':>8}{'total':>10}{'mean':>9}{'p95':>9}{'max':>9}{'hit%':>7}"]
+    lines.extend(
+      f"{row['name']:<24}{row['status']:<18}{row['count']:>8}{row['total_ms']:>10.1f}{row['mean_ms']:>9.2f}"
+      f"{row['p95_ms']:>9.2f}{row['max_ms']:>9.2f}{row['cache_hit_rate'] * 100:>7.1f}"
+      for row in self.table()
+    )
+    return "\n".join(lines)
+
+  def dump(self, file_path: str | Path) -> None:
+    """Write the table to a json file."""
+    try:
+      with Path(file_path).open("w", encoding="utf-8") as f:
+        json.dump(self.table(), f, indent=2)
+      logger.info("Detection profile saved to '%s'.", file_path)
+    except OSError:
+      logger.exception("Error saving detection profile to '%s'", file_path)
+
+  def reset(self) -> None:
+    """Drop all collected statistics."""
+    with self._lock:
+      self.stats.clear()
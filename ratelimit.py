@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+  """Token bucket refilled at rate tokens per second, holding at most burst tokens."""
+
+  def __init__(self, rate: float, burst: int) -> None:
+    self.rate = rate
+    self.burst = burst
+    self.tokens = float(burst)
+    self.updated = time.monotonic()
+    self._lock = threading.Lock()
+
+  def reserve(self, max_wait: float) -> float | None:
+    """Take one token and return how long to wait before using it, None if that exceeds max_wait."""
+    with self._lock:
+      now = time.monotonic()
+      self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+      self.updated = now
+      wait = max(1 - self.tokens, 0) / self.rate
+      if wait > max_wait:
+        return None
+      # tokens may go negative, later callers queue behind the ones already waiting
+      self.tokens -= 1
+      return wait
+
+
+@dataclass
+class LimitStats:
+  allowed: int = 0
+  throttled: int = 0
+  dropped: int = 0
+  waited: float = 0.0
+
+
+class RateLimiter:
+  """Per device and per action type token buckets for control events.
+
+  Actions that need a token within max_wait are delayed, anything later is dropped so input
+  queues on the device stay short during lag spikes. A rate of 0 disables limiting.
+  """
+
+  def __init__(self) -> None:
+    self.default: tuple[float, int] = (0.0, 1)
+    self.actions: dict[str, tuple[float, int]] = {}
+    self.devices: dict[str, dict[str, tuple[float, int]]] = {}
+    self.max_wait = 0.0
+    self.stats: dict[tuple[str, str], LimitStats] = {}
+    self._buckets: dict[tuple[str, str], TokenBucket | None] = {}
+    self._lock = threading.Lock()
+
+  def configure(
+    self,
+    default: tuple[float, int],
+    actions: dict[str, tuple[float, int]] | None = None,
+    devices: dict[str, dict[str, tuple[float, int]]] | None = None,
+    max_wait: float = 0.0,
+  ) -> None:
+    """Set (rate, burst) limits, device entries override action entries which override default."""
+    with self._lock:
+      self.default = default
+      self.actions = actions or {}
+      self.devices = devices or {}
+      self.max_wait = max_wait
+      self._buckets.clear()
+
+  def limit_for(self, device: str, action: str) -> tuple[float, int]:
+    """Return the (rate, burst) that applies to action on device."""
+    overrides = self.devices.get(device, {})
+    if action in overrides:
+      return overrides[action]
+    return self.actions.get(action, self.default)
+
+  def _bucket(self, key: tuple[str, str]) -> TokenBucket | None:
+    with self._lock:
+      if key not in self._buckets:
+        rate, burst = self.limit_for(*key)
+        self._buckets[key] = TokenBucket(rate, burst) if rate > 0 else None
+        self.stats.setdefault(key, LimitStats())
+      return self._buckets[key]
+
+  def acquire(self, device: str, action: str) -> bool:
+    """Block until action may be sent to device, False if it should be dropped instead."""
+    key = (device, action)
+    bucket = self._bucket(key)
+    stats = self.stats[key]
+    if bucket is None:
+      stats.allowed += 1
+      return True
+
+    wait = bucket.reserve(self.max_wait)
+    if wait is None:
+      stats.dropped += 1
+      logger.debug("Dropped %s on '%s', rate limit exceeded", action, device)
+      return False
+    if wait > 0:
+      stats.throttled += 1
+      stats.waited += wait
+      time.sleep(wait)
+    stats.allowed += 1
+    return True
+
+  def summary(self) -> dict[str, dict[str, float]]:
+    """Return allowed, throttled and dropped counts and total wait per device/action."""
+    return {
+      f"{device}/{action}": {
+        "allowed": stats.allowed,
+        "throttled": stats.throttled,
+        "dropped": stats.dropped,
+        "waited": stats.waited,
+      }
+      for (device, action), stats in self.stats.items()
+    }
+
+
+limiter = RateLimiter()
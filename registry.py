@@ -0,0 +1,165 @@
+import gc
+import logging
+import mmap
+import sys
+import threading
+import time
+import types
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import joblib
+import numpy as np
+from PIL import Image
+
+from models.interface import MLProtocol
+from models.onnx_model import OnnxModel
+
+logger = logging.getLogger(__name__)
+
+# code and namespaces are shared with the rest of the process, they are not part of a model
+_SHARED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.CodeType, types.FrameType)
+
+
+def footprint(model: Any) -> int:
+  """Estimate the bytes a loaded model holds by walking the objects it references.
+
+  Unlike a process wide measurement this is not affected by other threads allocating at the same
+  time. Memory-mapped numpy buffers are not counted since they stay in the page cache, and native
+  memory such as an onnxruntime session is not visible here.
+  """
+  seen: set[int] = set()
+  stack = [model]
+  total = 0
+  while stack:
+    obj = stack.pop()
+    if id(obj) in seen or isinstance(obj, _SHARED):
+      continue
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+      # count the buffer behind views once, arrays backed by a file mapping are left out
+      owner = obj
+      while isinstance(owner, np.ndarray) and owner.base is not None:
+        owner = owner.base
+      if id(owner) != id(obj) and id(owner) in seen:
+        continue
+      seen.add(id(owner))
+      if not isinstance(owner, mmap.mmap):
+        total += owner.nbytes if isinstance(owner, np.ndarray) else sys.getsizeof(owner)
+      continue
+    total += sys.getsizeof(obj)
+    stack.extend(gc.get_referents(obj))
+  return total
+
+
+@dataclass(frozen=True)
+class ModelInfo:
+  path: str
+  mmap_mode: str | None
+  load_time: float
+  memory: int
+
+
+class ModelRegistry:
+  """Load each model once per process and keep it around."""
+
+  def __init__(self) -> None:
+    self._models: dict[tuple[str, str | None], MLProtocol] = {}
+    self._info: dict[tuple[str, str | None], ModelInfo] = {}
+    self._locks: dict[tuple[str, str | None], threading.Lock] = {}
+    self._lock = threading.Lock()
+    # spawned pool workers and the inference server set these explicitly, see configure_onnx
+    self.onnx_threads = 1
+    self.onnx_int8 = False
+
+  def configure_onnx(self, threads: int, *, int8: bool) -> None:
+    """Set runtime options for .onnx models loaded after this call."""
+    self.onnx_threads = threads
+    self.onnx_int8 = int8
+
+  def _load(self, path: str, mmap_mode: str | None) -> MLProtocol:
+    source = Path(path)
+    if source.suffix != ".onnx":
+      return joblib.load(path, mmap_mode=mmap_mode)
+    # optional class names, one per line, next to the model
+    labels_path = source.with_suffix(".txt")
+    labels = labels_path.read_text(encoding="utf-8").splitlines() if labels_path.exists() else None
+    return OnnxModel(path, self.onnx_threads, int8=self.onnx_int8, labels=labels)
+
+  def _key_lock(self, key: tuple[str, str | None]) -> threading.Lock:
+    with self._lock:
+      return self._locks.setdefault(key, threading.Lock())
+
+  def load(self, path: str, mmap_mode: str | None = None) -> tuple[MLProtocol, ModelInfo]:
+    """Load a model from disk without touching the registry, measuring time and memory."""
+    start = time.perf_counter()
+    model = self._load(path, mmap_mode)
+    load_time = time.perf_counter() - start
+    memory = footprint(model)
+    if isinstance(model, OnnxModel):
+      # weights live in the native session, the file size is the closest estimate available
+      memory += Path(model.path).stat().st_size
+
+    info = ModelInfo(path, mmap_mode, load_time, memory)
+    logger.info("Loaded model '%s' in %.3fs (%.1f MiB)", path, load_time, info.memory / 2**20)
+    return (model, info)
+
+  def put(self, model: MLProtocol, info: ModelInfo) -> None:
+    """Register a loaded model, replacing any previous model for the same path."""
+    key = (info.path, info.mmap_mode)
+    self._models[key] = model
+    self._info[key] = info
+
+  def get(self, path: str, mmap_mode: str | None = None) -> MLProtocol:
+    """Return the model at path, loading it on first use."""
+    key = (path, mmap_mode)
+    model = self._models.get(key)
+    if model is not None:
+      return model
+
+    with self._key_lock(key):
+      # another thread may have finished loading while we waited
+      if key in self._models:
+        return self._models[key]
+
+      model, info = self.load(path, mmap_mode)
+      self.put(model, info)
+      return model
+
+  def warmup(self, paths: Iterable[str], mmap_mode: str | None = None, sample: Image.Image | None = None) -> None:
+    """Load models and run one prediction so lazy initialization happens now."""
+    sample = sample or Image.new("RGB", (32, 32))
+    for path in paths:
+      try:
+        self.get(path, mmap_mode).predict(sample)
+      except Exception:
+        logger.exception("Failed to warm up model '%s'", path)
+
+  def warmup_async(
+    self,
+    paths: Iterable[str],
+    mmap_mode: str | None = None,
+    sample: Image.Image | None = None,
+  ) -> threading.Thread:
+    """Warm up models on a background thread."""
+    thread = threading.Thread(
+      target=self.warmup,
+      args=(list(paths), mmap_mode, sample),
+      name="model-warmup",
+      daemon=True,
+    )
+    thread.start()
+    return thread
+
+  def is_loaded(self, path: str, mmap_mode: str | None = None) -> bool:
+    """Check whether a model was already loaded."""
+    return (path, mmap_mode) in self._models
+
+  def report(self) -> list[ModelInfo]:
+    """Return load time and memory for every loaded model."""
+    return list(self._info.values())
+
+
+registry = ModelRegistry()
@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy as np
+import toml
+
+Box = tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class Region:
+  """Rectangle in normalized (0-1) screen coordinates."""
+
+  x: float
+  y: float
+  w: float
+  h: float
+
+
+@dataclass(frozen=True)
+class Point:
+  """Point in normalized (0-1) screen coordinates."""
+
+  x: float
+  y: float
+
+
+@dataclass(frozen=True)
+class Template:
+  """Template image captured at reference_width pixels, searched inside region."""
+
+  path: str
+  region: Region
+  reference_width: int
+
+
+class CompiledRoi:
+  """Pixel lookup table for one device's resolution, zoom ratio and flip mode."""
+
+  def __init__(
+    self,
+    boxes: dict[str, np.ndarray],
+    points: dict[str, np.ndarray],
+    templates: dict[str, np.ndarray],
+  ) -> None:
+    self._box_index = {name: i for i, name in enumerate(boxes)}
+    self._point_index = {name: i for i, name in enumerate(points)}
+    self.boxes = np.array(list(boxes.values()), dtype=np.int32).reshape(-1, 4)
+    self.points = np.array(list(points.values()), dtype=np.int32).reshape(-1, 2)
+    self.templates = templates
+
+  def box(self, name: str) -> Box:
+    """Return (left, top, right, bottom) of a region or template search area."""
+    left, top, right, bottom = self.boxes[self._box_index[name]].tolist()
+    return (left, top, right, bottom)
+
+  def point(self, name: str) -> tuple[int, int]:
+    """Return (x, y) of a point."""
+    x, y = self.points[self._point_index[name]].tolist()
+    return (x, y)
+
+  def template(self, name: str) -> np.ndarray:
+    """Return a template image scaled to this device."""
+    return self.templates[name]
+
+  def crop(self, frame: np.ndarray, name: str) -> np.ndarray:
+    """Return a view of the frame inside a named region."""
+    left, top, right, bottom = self.boxes[self._box_index[name]]
+    return frame[top:bottom, left:right]
+
+
+class RoiSchema:
+  """Resolution independent declaration of regions, points and templates."""
+
+  def __init__(
+    self,
+    regions: dict[str, Region] | None = None,
+    points: dict[str, Point] | None = None,
+    templates: dict[str, Template] | None = None,
+  ) -> None:
+    self.regions = regions or {}
+    self.points = points or {}
+    self.templates = templates or {}
+
+  @classmethod
+  def from_dict(cls, data: dict[str, Any]) -> "RoiSchema":
+    """Build a schema from [regions.*], [points.*] and [templates.*] tables."""
+    templates = {}
+    for name, t in data.get("templates", {}).items():
+      region = Region(t["x"], t["y"], t["w"], t["h"])
+      templates[name] = Template(t["path"], region, t["reference_width"])
+    return cls(
+      {name: Region(**r) for name, r in data.get("regions", {}).items()},
+      {name: Point(**p) for name, p in data.get("points", {}).items()},
+      templates,
+    )
+
+  @classmethod
+  def load(cls, file_path: str | Path) -> "RoiSchema":
+    """Load a schema from a toml file."""
+    with Path(file_path).open("r", encoding="utf-8") as f:
+      return cls.from_dict(toml.load(f))
+
+  def compile(self, resolution: tuple[int, int], zoom_ratio: float = 1.0, *, flip: bool = False) -> CompiledRoi:
+    """Resolve every entry to pixels of the frames this device produces.
+
+    Frames are resized by zoom_ratio in ADBScreen and mirrored horizontally when the scrcpy client
+    is created with flip, so both are applied here once instead of on every lookup.
+    """
+    width = int(resolution[0] * zoom_ratio)
+    height = int(resolution[1] * zoom_ratio)
+
+    def to_box(r: Region) -> np.ndarray:
+      x = 1.0 - r.x - r.w if flip else r.x
+      return np.rint([x * width, r.y * height, (x + r.w) * width, (r.y + r.h) * height])
+
+    boxes = {name: to_box(r) for name, r in self.regions.items()}
+    boxes.update({name: to_box(t.region) for name, t in self.templates.items()})
+    points = {name: np.rint([((1.0 - p.x) if flip else p.x) * width, p.y * height]) for name, p in self.points.items()}
+
+    templates = {}
+    for name, t in self.templates.items():
+      image = cv2.imread(t.path)
+      if image is None:
+        msg = f"Cannot read template image '{t.path}'"
+        raise FileNotFoundError(msg)
+      scale = width / t.reference_width
+      if scale != 1.0:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+      if flip:
+        image = cv2.flip(image, 1)
+      templates[name] = image
+
+    return CompiledRoi(boxes, points, templates)
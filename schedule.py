@@ -0,0 +1,68 @@
+import time
+from typing import Any
+
+from detect import Detect, DetectionResult, Detector
+
+
+class DetectionScheduler:
+  """Decide which detectors run on a tick based on their rate, priority and cost.
+
+  budget is the detection time allowed per tick in seconds, 0 means unlimited. It defaults to
+  [detection].detect_budget (ms) from the settings of detect.
+  """
+
+  def __init__(self, detect: Detect, budget: float | None = None, smoothing: float = 0.2) -> None:
+    self.detect = detect
+    self.budget = detect.settings.detect_budget / 1000 if budget is None else budget
+    self.smoothing = smoothing
+    self.last_run: dict[str, float] = {}
+    self.estimates: dict[str, float] = {}
+    self.skipped: dict[str, int] = {}
+    self._pending: set[str] = set()
+
+  def trigger(self, event: str) -> None:
+    """Make detectors waiting on event due on the next tick."""
+    self._pending.update(d.name for d in self.detect.detectors.values() if d.trigger == event)
+
+  def _overdue(self, detector: Detector, now: float) -> float | None:
+    """Return how long a detector is overdue, or None if it is not due."""
+    if detector.trigger is not None:
+      return float("inf") if detector.name in self._pending else None
+    last = self.last_run.get(detector.name)
+    if last is None:
+      return float("inf")
+    interval = 1 / detector.rate if detector.rate > 0 else 0.0
+    overdue = now - last - interval
+    return overdue if overdue >= 0 else None
+
+  def due(self, now: float | None = None) -> list[Detector]:
+    """Return due detectors, highest priority and most overdue first."""
+    now = time.monotonic() if now is None else now
+    ranked = []
+    for detector in self.detect.detectors.values():
+      overdue = self._overdue(detector, now)
+      if overdue is not None:
+        ranked.append((detector.priority, overdue, detector))
+    ranked.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    return [detector for _, _, detector in ranked]
+
+  def tick(self, frame: Any, seq: int = -1) -> dict[str, DetectionResult]:
+    """Run due detectors on a frame until the per-tick budget is spent."""
+    results = {}
+    spent = 0.0
+    for detector in self.due():
+      estimate = self.estimates.get(detector.name, detector.cost)
+      # the first detector always runs so a budget smaller than any cost cannot starve everything
+      if self.budget > 0 and results and spent + estimate > self.budget:
+        self.skipped[detector.name] = self.skipped.get(detector.name, 0) + 1
+        continue
+
+      start = time.perf_counter()
+      results[detector.name] = self.detect.detect(detector.name, frame, seq)
+      elapsed = time.perf_counter() - start
+
+      spent += elapsed
+      self.estimates[detector.name] = estimate + self.smoothing * (elapsed - estimate)
+      self.last_run[detector.name] = time.monotonic()
+      self._pending.discard(detector.name)
+    return results
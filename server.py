@@ -0,0 +1,174 @@
+import argparse
+import itertools
+import logging
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+from models.interface import MLProtocol
+from registry import registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = ("127.0.0.1", 50051)
+DEFAULT_AUTHKEY = b"mgab-inference"
+
+
+class InferenceServer:
+  """Serve one model to many bots, batching requests that arrive within a short window."""
+
+  def __init__(
+    self,
+    model: MLProtocol,
+    address: tuple[str, int] = DEFAULT_ADDRESS,
+    window: float = 0.005,
+    max_batch: int = 32,
+    authkey: bytes = DEFAULT_AUTHKEY,
+  ) -> None:
+    self.model = model
+    self.window = window
+    self.max_batch = max_batch
+    self.listener = Listener(address, authkey=authkey)
+    self.batches = 0
+    self.samples = 0
+    self._requests: queue.Queue[tuple[Connection, threading.Lock, int, Any]] = queue.Queue()
+    self._running = False
+
+  def _read(self, conn: Connection) -> None:
+    send_lock = threading.Lock()
+    try:
+      while self._running:
+        request_id, image = conn.recv()
+        self._requests.put((conn, send_lock, request_id, image))
+    except (EOFError, OSError):
+      pass
+    finally:
+      conn.close()
+
+  def _accept(self) -> None:
+    while self._running:
+      try:
+        conn = self.listener.accept()
+      except OSError:
+        break
+      threading.Thread(target=self._read, args=(conn,), daemon=True).start()
+
+  def _collect(self) -> list[tuple[Connection, threading.Lock, int, Any]]:
+    try:
+      batch = [self._requests.get(timeout=0.5)]
+    except queue.Empty:
+      return []
+    deadline = time.monotonic() + self.window
+    while len(batch) < self.max_batch:
+      remaining = deadline - time.monotonic()
+      if remaining <= 0:
+        break
+      try:
+        batch.append(self._requests.get(timeout=remaining))
+      except queue.Empty:
+        break
+    return batch
+
+  def _predict_each(self, images: list[Image.Image]) -> list[Any]:
+    results = []
+    for image in images:
+      try:
+        results.append(self.model.predict(image))
+      except Exception as e:
+        logger.exception("Prediction failed")
+        results.append(e)
+    return results
+
+  def _run_batch(self, images: list[Image.Image]) -> list[Any]:
+    predict_batch = getattr(self.model, "predict_batch", None)
+    if predict_batch is not None and len(images) > 1:
+      try:
+        return predict_batch(images)
+      except Exception:
+        # one odd request must not fail every client in the batch
+        logger.warning("Batch prediction failed, predicting requests one by one", exc_info=True)
+    return self._predict_each(images)
+
+  def serve_forever(self) -> None:
+    """Accept clients and answer their requests until stop is called."""
+    self._running = True
+    threading.Thread(target=self._accept, daemon=True).start()
+    logger.info("Inference server listening on %s", self.listener.address)
+    while self._running:
+      batch = self._collect()
+      if not batch:
+        continue
+      images = [Image.fromarray(image) for _, _, _, image in batch]
+      results = self._run_batch(images)
+      self.batches += 1
+      self.samples += len(batch)
+
+      for (conn, send_lock, request_id, _), result in zip(batch, results, strict=True):
+        try:
+          with send_lock:
+            conn.send((request_id, result))
+        except OSError:
+          logger.warning("Client disconnected before receiving its result")
+
+  def stop(self) -> None:
+    """Stop serving."""
+    self._running = False
+    self.listener.close()
+
+
+class InferenceClient:
+  """MLProtocol proxy that sends predictions to an InferenceServer."""
+
+  def __init__(self, address: tuple[str, int] = DEFAULT_ADDRESS, authkey: bytes = DEFAULT_AUTHKEY) -> None:
+    self.conn = Client(address, authkey=authkey)
+    self._ids = itertools.count()
+    self._lock = threading.Lock()
+
+  def predict(self, image: Image.Image) -> Any:
+    """Send an image to the server and wait for its prediction."""
+    with self._lock:
+      request_id = next(self._ids)
+      self.conn.send((request_id, np.asarray(image)))
+      reply_id, result = self.conn.recv()
+    if reply_id != request_id:
+      msg = f"Inference reply {reply_id} does not match request {request_id}"
+      raise RuntimeError(msg)
+    if isinstance(result, Exception):
+      raise result
+    return result
+
+  def close(self) -> None:
+    """Close the connection."""
+    self.conn.close()
+
+
+def parse_address(text: str) -> tuple[str, int]:
+  """Parse host:port."""
+  host, _, port = text.rpartition(":")
+  return (host or DEFAULT_ADDRESS[0], int(port))
+
+
+if __name__ == "__main__":
+  from log import setup_logger
+
+  parser = argparse.ArgumentParser(description="Serve one model to every bot on this host.")
+  parser.add_argument("model", help="model path, .onnx or joblib")
+  parser.add_argument("--address", default=f"{DEFAULT_ADDRESS[0]}:{DEFAULT_ADDRESS[1]}", help="host:port to listen on")
+  parser.add_argument("--window", type=float, default=5, help="batching window in ms")
+  parser.add_argument("--max-batch", type=int, default=32)
+  parser.add_argument("--threads", type=int, default=1, help="onnxruntime intra-op threads")
+  parser.add_argument("--int8", action="store_true", help="run the int8 quantized model")
+  args = parser.parse_args()
+
+  setup_logger(gui_log_handler_enabled=False)
+  registry.configure_onnx(args.threads, int8=args.int8)
+  server = InferenceServer(registry.get(args.model), parse_address(args.address), args.window / 1000, args.max_batch)
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    server.stop()
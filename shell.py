@@ -0,0 +1,111 @@
+import contextlib
+import itertools
+import logging
+import re
+import threading
+
+from adbutils import AdbConnection, AdbDevice, AdbError
+
+logger = logging.getLogger(__name__)
+
+FOCUS_PATTERN = re.compile(r"(?:mCurrentFocus|mFocusedApp)=.*?\s(?P<package>[\w.]+)/(?P<activity>[\w.$]+)")
+
+
+class _UnsentError(OSError):
+  """The channel failed before a command was written, so it did not run."""
+
+
+class ShellSession:
+  """Long lived `adb shell` channel that runs commands one after another.
+
+  Each command is followed by an echo of a unique marker and the exit code, output is read up
+  to that marker. A broken channel is reopened and the command retried once, but only if it
+  failed before the command was written or the command is marked idempotent, so commands with side
+  effects such as key events never run twice.
+  """
+
+  def __init__(self, device: AdbDevice, timeout: float = 5.0) -> None:
+    self.device = device
+    self.timeout = timeout
+    self._conn: AdbConnection | None = None
+    self._ids = itertools.count()
+    self._lock = threading.Lock()
+
+  def _open(self) -> AdbConnection:
+    conn = self.device.shell("sh", stream=True)
+    conn.conn.settimeout(self.timeout)
+    conn.conn.sendall(b"exec 2>&1\n")
+    return conn
+
+  def _send(self, conn: AdbConnection, command: str) -> bytes:
+    marker = f"__MGAB_END_{next(self._ids)}__".encode()
+    conn.conn.sendall(f"{command}\necho {marker.decode()} $?\n".encode())
+    return marker
+
+  def _receive(self, conn: AdbConnection, marker: bytes) -> tuple[int, str]:
+    buffer = b""
+    while True:
+      index = buffer.find(marker)
+      if index >= 0 and buffer.find(b"\n", index) >= 0:
+        code = buffer[index + len(marker) : buffer.find(b"\n", index)].strip()
+        return (int(code or 0), buffer[:index].decode(errors="replace"))
+      chunk = conn.conn.recv(65536)
+      if not chunk:
+        msg = "adb shell channel closed"
+        raise ConnectionError(msg)
+      buffer += chunk
+
+  def _run_once(self, command: str) -> tuple[int, str]:
+    try:
+      if self._conn is None:
+        self._conn = self._open()
+      marker = self._send(self._conn, command)
+    except (OSError, AdbError) as e:
+      self._close()
+      raise _UnsentError(str(e)) from e
+    try:
+      return self._receive(self._conn, marker)
+    except (OSError, AdbError):
+      self._close()
+      raise
+
+  def run(self, command: str, *, idempotent: bool = False) -> tuple[int, str]:
+    """Run a command and return (exit code, output), idempotent allows a retry after it was sent."""
+    with self._lock:
+      try:
+        return self._run_once(command)
+      except _UnsentError as e:
+        logger.warning("adb shell channel broken (%s), reconnecting", e)
+      except (OSError, AdbError) as e:
+        if not idempotent:
+          raise
+        logger.warning("adb shell channel broken (%s), reconnecting and retrying", e)
+      return self._run_once(command)
+
+  def _close(self) -> None:
+    if self._conn is not None:
+      with contextlib.suppress(OSError):
+        self._conn.close()
+      self._conn = None
+
+  def close(self) -> None:
+    """Close the channel."""
+    with self._lock:
+      self._close()
+
+  def keyevent(self, key: str) -> None:
+    """Send an android key event."""
+    self.run(f"input keyevent {key}")
+
+  def current_app(self) -> tuple[str, str]:
+    """Return (package, activity) of the focused window, empty strings if unknown."""
+    _, output = self.run("dumpsys window | grep -E 'mCurrentFocus|mFocusedApp'", idempotent=True)
+    match = FOCUS_PATTERN.search(output)
+    if match is None:
+      return ("", "")
+    return (match.group("package"), match.group("activity"))
+
+  def restart_app(self, package: str) -> None:
+    """Force stop and launch an app."""
+    self.run(f"am force-stop {package}", idempotent=True)
+    self.run(f"monkey -p {package} -c android.intent.category.LAUNCHER 1")
@@ -0,0 +1,76 @@
+import time
+
+import numpy as np
+import pytest
+
+scrcpy = pytest.importorskip("scrcpy")
+
+from control import ScrcpyControl  # noqa: E402
+from gesture import GesturePlanner  # noqa: E402
+
+# the schedule starts just before the press is recorded, so allow a little slack on both sides
+MAX_EARLINESS = 0.001
+MAX_LATENESS = 0.05
+
+
+class FakeADB:
+  """Record touch events instead of writing them to a scrcpy control socket."""
+
+  def __init__(self, resolution: tuple[int, int] = (1080, 1920), *, flip: bool = False) -> None:
+    self.client = object()
+    self.flip = flip
+    self.resolution = resolution
+    self.adb_device_code = "fake"
+    self.events: list[tuple[float, tuple[int, int], int]] = []
+
+  def get_resolution(self) -> tuple[int, int]:
+    """Return the fake screen size."""
+    return self.resolution
+
+  def touch(self, xy: tuple[int, int], action: int, touch_id: int = -1) -> bytes:  # noqa: ARG002
+    """Record one touch event with the time it was sent."""
+    self.events.append((time.perf_counter(), xy, action))
+    return b""
+
+
+class RecordingControl(ScrcpyControl):
+  def __init__(self, fake: FakeADB, planner: GesturePlanner) -> None:
+    super().__init__(hold=0.0, planner=planner)
+    self.fake = fake
+
+  def adb(self) -> FakeADB:
+    """Return the recording device."""
+    return self.fake
+
+
+def test_tap_goes_through_planner_transform() -> None:
+  fake = FakeADB()
+  RecordingControl(fake, GesturePlanner(zoom_ratio=0.5)).tap((100, 50))
+  assert [(xy, action) for _, xy, action in fake.events] == [
+    ((200, 100), scrcpy.ACTION_DOWN),
+    ((200, 100), scrcpy.ACTION_UP),
+  ]
+
+
+def test_tap_is_mirrored_back_on_flipped_frames() -> None:
+  fake = FakeADB((1000, 2000), flip=True)
+  RecordingControl(fake, GesturePlanner()).tap((100, 50))
+  assert {xy for _, xy, _ in fake.events} == {(900, 50)}
+
+
+def test_drag_sends_planned_points_on_schedule() -> None:
+  fake = FakeADB()
+  control = RecordingControl(fake, GesturePlanner(speed=2000.0, interval=0.004, random_offset=5, seed=7))
+  control.drag((100, 100), (500, 300))
+  plan = GesturePlanner(speed=2000.0, interval=0.004, random_offset=5, seed=7).drag((100, 100), (500, 300))
+
+  times = np.array([t for t, _, _ in fake.events])
+  points = np.array([xy for _, xy, _ in fake.events])
+  actions = [action for _, _, action in fake.events]
+  assert actions == [scrcpy.ACTION_DOWN] + [scrcpy.ACTION_MOVE] * (len(plan.times) - 1) + [scrcpy.ACTION_UP]
+  np.testing.assert_array_equal(points[:-1], plan.points)
+  np.testing.assert_array_equal(points[-1], plan.points[-1])
+  # moves are never early and stay close to their planned time
+  offsets = times[:-1] - times[0] - plan.times
+  assert offsets.min() > -MAX_EARLINESS
+  assert offsets.max() < MAX_LATENESS
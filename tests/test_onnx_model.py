@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from onnx import TensorProto, helper, numpy_helper  # noqa: E402
+
+from models.onnx_model import OnnxModel  # noqa: E402
+
+
+def write_model(path: Path, height: int | str, width: int | str) -> str:
+  """Write a tiny classifier: mean color of an RGB image times a 3x2 weight matrix."""
+  weights = np.array([[1.0, -1.0], [0.0, 0.0], [-1.0, 1.0]], dtype=np.float32)
+  graph = helper.make_graph(
+    [
+      helper.make_node("ReduceMean", ["image"], ["color"], axes=[2, 3], keepdims=0),
+      helper.make_node("MatMul", ["color", "weights"], ["scores"]),
+    ],
+    "tiny",
+    [helper.make_tensor_value_info("image", TensorProto.FLOAT, ["batch", 3, height, width])],
+    [helper.make_tensor_value_info("scores", TensorProto.FLOAT, ["batch", 2])],
+    [numpy_helper.from_array(weights, "weights")],
+  )
+  # an IR version every onnxruntime release in use can load
+  model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)], ir_version=8)
+  onnx.save(model, str(path))
+  return str(path)
+
+
+@pytest.fixture
+def model_path(tmp_path: Path) -> str:
+  return write_model(tmp_path / "tiny.onnx", 4, 4)
+
+
+def test_predict_returns_label(model_path: str) -> None:
+  model = OnnxModel(model_path, labels=["red", "blue"])
+  assert model.input_size == (4, 4)
+  assert model.predict(Image.new("RGB", (8, 8), (255, 0, 0))) == "red"
+  assert model.predict(np.full((4, 4, 3), (0, 0, 255), dtype=np.uint8)) == "blue"
+
+
+def test_predict_batch_matches_predict(model_path: str) -> None:
+  model = OnnxModel(model_path)
+  images = [Image.new("RGB", (4, 4), color) for color in [(255, 0, 0), (0, 0, 255), (128, 128, 128)]]
+  batch = model.predict_batch(images)
+  assert len(batch) == len(images)
+  for image, row in zip(images, batch, strict=True):
+    np.testing.assert_allclose(row, model.predict(image), rtol=1e-6)
+
+
+def test_int8_matches_float(model_path: str) -> None:
+  labels = ["red", "blue"]
+  model = OnnxModel(model_path, labels=labels)
+  quantized = OnnxModel(model_path, int8=True, labels=labels)
+  assert quantized.path.endswith(".int8.onnx")
+  assert Path(quantized.path).exists()
+  for color in [(255, 0, 0), (0, 0, 255), (200, 30, 60)]:
+    image = Image.new("RGB", (4, 4), color)
+    assert quantized.predict(image) == model.predict(image)
+
+
+def test_predict_batch_mixed_sizes_with_dynamic_input(tmp_path: Path) -> None:
+  model = OnnxModel(write_model(tmp_path / "dynamic.onnx", "height", "width"), labels=["red", "blue"])
+  assert model.input_size is None
+  images = [
+    Image.new("RGB", (10, 6), (255, 0, 0)),
+    Image.new("RGB", (20, 8), (0, 0, 255)),
+    Image.new("RGB", (10, 6), (0, 0, 255)),
+  ]
+  assert model.predict_batch(images) == ["red", "blue", "blue"]
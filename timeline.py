@@ -0,0 +1,177 @@
+import threading
+import time
+from enum import IntEnum
+from typing import Any
+
+import numpy as np
+
+
+def _kind(value: Any) -> tuple[str, type | None]:
+  """Return the storage kind of a value and the type to restore exact ints as."""
+  if isinstance(value, (bool, IntEnum)):
+    return ("int", type(value))
+  if isinstance(value, (int, np.integer)):
+    return ("int", None)
+  if isinstance(value, (float, np.floating)):
+    return ("float", None)
+  try:
+    hash(value)
+  except TypeError:
+    return ("object", None)
+  return ("label", None)
+
+
+def _same(a: Any, b: Any) -> bool:
+  try:
+    return bool(a == b)
+  except ValueError:
+    # arrays compare elementwise
+    return bool(np.array_equal(a, b))
+
+
+class _Channel:
+  """Fixed size ring of (timestamp, seq, value) columns for one detector.
+
+  Ints, bools and enums are stored exactly and floats as float64. Other hashable values are
+  interned to int codes, anything else is kept in an object column. A value that does not fit
+  the current column promotes it, ints to float64 and everything else to object.
+  """
+
+  def __init__(self, capacity: int, sample: Any) -> None:
+    self.times = np.zeros(capacity, dtype=np.float64)
+    self.seqs = np.zeros(capacity, dtype=np.int64)
+    self.kind, self.enum = _kind(sample)
+    dtype = {"int": np.int64, "float": np.float64, "label": np.int64, "object": object}[self.kind]
+    self.values = np.zeros(capacity, dtype=dtype) if dtype is not object else np.empty(capacity, dtype=object)
+    self.codes: dict[Any, int] = {}
+    self.labels: list[Any] = []
+    self.count = 0
+
+  def _promote(self, kind: str, enum: type | None) -> None:
+    if self.kind == "float" and kind == "int" and enum is None:
+      return
+    if self.kind == "int" and self.enum is None and kind == "float":
+      self.values = self.values.astype(np.float64)
+      self.kind = "float"
+      return
+    values = np.empty(len(self.values), dtype=object)
+    for i in range(min(self.count, len(self.values))):
+      values[i] = self.decode(self.values[i])
+    self.values = values
+    self.kind, self.enum = ("object", None)
+    self.codes.clear()
+    self.labels.clear()
+
+  def encode(self, value: Any) -> Any:
+    if self.kind == "label":
+      code = self.codes.get(value)
+      if code is None:
+        code = self.codes[value] = len(self.labels)
+        self.labels.append(value)
+      return code
+    return value
+
+  def decode(self, raw: Any) -> Any:
+    if self.kind == "object":
+      return raw
+    if self.kind == "label":
+      return self.labels[int(raw)]
+    if self.enum is not None:
+      return self.enum(int(raw))
+    return raw.item()
+
+  def append(self, timestamp: float, seq: int, value: Any) -> None:
+    kind, enum = _kind(value)
+    if (kind, enum) != (self.kind, self.enum) and self.kind != "object":
+      self._promote(kind, enum)
+    i = self.count % len(self.times)
+    self.times[i] = timestamp
+    self.seqs[i] = seq
+    self.values[i] = self.encode(value)
+    self.count += 1
+
+  def changes(self, values: np.ndarray) -> np.ndarray:
+    """Return indices i where values[i + 1] differs from values[i]."""
+    if self.kind != "object":
+      return np.flatnonzero(values[1:] != values[:-1])
+    return np.array([i for i in range(len(values) - 1) if not _same(values[i], values[i + 1])], dtype=np.int64)
+
+  def ordered(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the stored columns oldest first."""
+    capacity = len(self.times)
+    if self.count <= capacity:
+      end = self.count
+      return (self.times[:end], self.seqs[:end], self.values[:end])
+    start = self.count % capacity
+    order = np.r_[start:capacity, 0:start]
+    return (self.times[order], self.seqs[order], self.values[order])
+
+
+class Timeline:
+  """Append-only, bounded history of detector outputs for one device."""
+
+  def __init__(self, capacity: int = 1024) -> None:
+    self.capacity = capacity
+    self._channels: dict[str, _Channel] = {}
+    self._lock = threading.Lock()
+
+  def append(self, name: str, value: Any, seq: int = -1, timestamp: float | None = None) -> None:
+    """Store one output, evicting the oldest once the channel is full."""
+    timestamp = time.monotonic() if timestamp is None else timestamp
+    with self._lock:
+      channel = self._channels.get(name)
+      if channel is None:
+        channel = self._channels[name] = _Channel(self.capacity, value)
+      channel.append(timestamp, seq, value)
+
+  def latest(self, name: str) -> tuple[float, int, Any] | None:
+    """Return (timestamp, seq, value) of the newest entry."""
+    with self._lock:
+      channel = self._channels.get(name)
+      if channel is None or channel.count == 0:
+        return None
+      i = (channel.count - 1) % self.capacity
+      return (float(channel.times[i]), int(channel.seqs[i]), channel.decode(channel.values[i]))
+
+  def window(self, name: str, seconds: float, now: float | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return raw (timestamps, seqs, values) columns of the last seconds, oldest first."""
+    now = time.monotonic() if now is None else now
+    with self._lock:
+      channel = self._channels.get(name)
+      if channel is None:
+        empty = np.zeros(0)
+        return (empty, empty.astype(np.int64), empty)
+      times, seqs, values = channel.ordered()
+    first = np.searchsorted(times, now - seconds, side="left")
+    return (times[first:], seqs[first:], values[first:])
+
+  def values_since(self, name: str, seconds: float, now: float | None = None) -> list[tuple[float, Any]]:
+    """Return (timestamp, value) pairs of the last seconds, oldest first."""
+    times, _, values = self.window(name, seconds, now)
+    channel = self._channels[name] if len(times) else None
+    return [(float(t), channel.decode(v)) for t, v in zip(times, values, strict=True)]
+
+  def last_change(self, name: str) -> float | None:
+    """Return when the value last differed from the entry before it, None if it never changed."""
+    with self._lock:
+      channel = self._channels.get(name)
+      if channel is None:
+        return None
+      times, _, values = channel.ordered()
+    changed = channel.changes(values)
+    if len(changed) == 0:
+      return None
+    return float(times[changed[-1] + 1])
+
+  def stable_for(self, name: str, now: float | None = None) -> float:
+    """Return how long the current value has held, within the retained history."""
+    now = time.monotonic() if now is None else now
+    changed = self.last_change(name)
+    if changed is not None:
+      return now - changed
+    with self._lock:
+      channel = self._channels.get(name)
+      if channel is None or channel.count == 0:
+        return 0.0
+      times, _, _ = channel.ordered()
+    return now - float(times[0])
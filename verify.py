@@ -0,0 +1,100 @@
+import logging
+import time
+from collections.abc import Callable
+from typing import Any
+
+from cache import content_hash
+from control import ControlInterface
+from detect import Detect, crop
+from hub import FrameHub
+from roi import Box
+
+logger = logging.getLogger(__name__)
+
+Condition = Callable[[Any], bool]
+
+
+def detector_holds(detect: Detect, name: str, predicate: Callable[[Any], bool]) -> Condition:
+  """Condition that runs a registered detector on the frame and checks its value."""
+  return lambda frame: predicate(detect.detect(name, frame).value)
+
+
+def detector_equals(detect: Detect, name: str, expected: Any) -> Condition:
+  """Condition that holds once a detector reports expected, e.g. a new mode.Status."""
+  return detector_holds(detect, name, lambda value: value == expected)
+
+
+class ActionVerifier:
+  """Send actions and wait on the frame hub until their expected effect shows up.
+
+  This replaces fixed sleeps after actions: the call returns as soon as a frame newer than the
+  action satisfies the condition, and the action is repeated up to retries times on timeout.
+  """
+
+  def __init__(self, control: ControlInterface, hub: FrameHub, timeout: float = 2.0, retries: int = 1) -> None:
+    self.control = control
+    self.hub = hub
+    self.timeout = timeout
+    self.retries = retries
+
+  def wait_for(self, condition: Condition, timeout: float, after_seq: int | None = None) -> bool:
+    """Block until a frame after after_seq satisfies condition, False on timeout."""
+    seq = self.hub.seq if after_seq is None else after_seq
+    deadline = time.monotonic() + timeout
+    while (remaining := deadline - time.monotonic()) > 0:
+      latest = self.hub.wait_next(seq, remaining)
+      if latest is None:
+        return False
+      seq, _, frame = latest
+      if condition(frame):
+        return True
+    return False
+
+  def act_and_wait(
+    self,
+    action: Callable[[], None],
+    condition: Condition,
+    timeout: float | None = None,
+    retries: int | None = None,
+  ) -> bool:
+    """Run action and wait for condition, repeating the action on timeout."""
+    timeout = self.timeout if timeout is None else timeout
+    retries = self.retries if retries is None else retries
+    for attempt in range(retries + 1):
+      seq = self.hub.seq
+      action()
+      if self.wait_for(condition, timeout, seq):
+        return True
+      logger.info("Expected effect not seen after attempt %d of %d", attempt + 1, retries + 1)
+    return False
+
+  def region_changed(self, box: Box | None) -> Condition:
+    """Condition that holds once a region differs from how it looks now."""
+    _, _, frame = self.hub.latest()
+    before = content_hash(crop(frame, box)) if frame is not None else b""
+    return lambda frame: content_hash(crop(frame, box)) != before
+
+  def tap_and_wait(
+    self,
+    pos: tuple[int, int],
+    condition: Condition,
+    timeout: float | None = None,
+    retries: int | None = None,
+  ) -> bool:
+    """Tap and wait until condition holds."""
+    return self.act_and_wait(lambda: self.control.tap(pos), condition, timeout, retries)
+
+  def back_and_wait(self, condition: Condition, timeout: float | None = None, retries: int | None = None) -> bool:
+    """Send BACK and wait until condition holds."""
+    return self.act_and_wait(self.control.back, condition, timeout, retries)
+
+  def drag_and_wait(
+    self,
+    src: tuple[int, int],
+    dst: tuple[int, int],
+    condition: Condition,
+    timeout: float | None = None,
+    retries: int = 0,
+  ) -> bool:
+    """Drag and wait until condition holds, drags are not repeated by default."""
+    return self.act_and_wait(lambda: self.control.drag(src, dst), condition, timeout, retries)
@@ -0,0 +1,58 @@
+import win32api
+import win32con
+
+from adb import ADB
+from control import ControlInterface
+from gesture import GesturePlanner, perform
+
+
+class WIN32Control(ControlInterface):
+  """Control device with WIN32 API."""
+
+  planner = GesturePlanner(speed=5000.0, interval=0.002)
+
+  def __init__(self, _hwnd: int, planner: GesturePlanner | None = None) -> None:
+    """Initialize with window number."""
+    if planner is not None:
+      self.planner = planner
+    self.hwnd = _hwnd
+    if self.hwnd is None:
+      raise Exception("Need hwnd parameter in WIN32API mode")
+
+  def adb(self) -> ADB:
+    """Dynamically get ADB instance."""
+    return ADB("")
+
+  def tap(self, pos: tuple[int, int]) -> None:
+    """Click on pos[x, y]."""
+    x, y = self.planner.tap(pos)
+    click_pos = win32api.MAKELONG(x, y)
+    win32api.PostMessage(self.hwnd, win32con.WM_LBUTTONDOWN, win32con.MK_LBUTTON, click_pos)
+    win32api.PostMessage(self.hwnd, win32con.WM_LBUTTONUP, None, click_pos)
+
+  def back(self) -> None:
+    """Android BACK event."""
+    # not supported
+
+  def drag_press(self, src: tuple[int, int], dst: tuple[int, int]) -> None:
+    """Drag from src[x,y] to dst[x,y]."""
+
+    def send(point: tuple[int, int], action: str) -> None:
+      click_pos = win32api.MAKELONG(point[0], point[1])
+      if action == "down":
+        win32api.PostMessage(self.hwnd, win32con.WM_LBUTTONDOWN, win32con.MK_LBUTTON, click_pos)
+      elif action == "move":
+        win32api.PostMessage(self.hwnd, win32con.WM_MOUSEMOVE, win32con.MK_LBUTTON, click_pos)
+
+    # drag_up releases the button, so "up" is not sent here
+    perform(self.planner.drag(src, dst), send)
+
+  def drag_up(self, dst: tuple[int, int]) -> None:
+    """Drag up."""
+    click_pos = win32api.MAKELONG(dst[0], dst[1])
+    win32api.PostMessage(self.hwnd, win32con.WM_LBUTTONUP, win32con.MK_LBUTTON, click_pos)
+
+  def drag(self, src: tuple[int, int], dst: tuple[int, int]) -> None:
+    """Drag from src to dst."""
+    self.drag_press(src, dst)
+    self.drag_up(dst)